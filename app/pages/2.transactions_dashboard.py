@@ -6,29 +6,52 @@
 # ==========================================================
 
 import os
+import sys
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+TX_PATH = os.path.join(BASE_DIR, "data", "transactions.csv")
+CUST_PATH = os.path.join(BASE_DIR, "data", "customers.csv")
+sys.path.insert(0, os.path.join(BASE_DIR, "scripts"))
+import charts
+import metadata
+import refresh
+import sampling
+from fx import BASE_CURRENCY
+
 # ----------------------------------------------------------
 # 1️⃣ Data Loading
 # ----------------------------------------------------------
-@st.cache_data
-def load_data():
-    """Load both transactions.csv and customers.csv safely."""
-    base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
-    tx_path = os.path.join(base_path, "data", "transactions.csv")
-    cust_path = os.path.join(base_path, "data", "customers.csv")
+@st.cache_resource
+def transaction_cache():
+    """Typed transactions kept in memory; sync() only reads parts added since the last version."""
+    return refresh.TransactionCache()
+
 
-    if not os.path.exists(tx_path):
-        st.error(f"❌ transactions.csv not found at: {tx_path}")
+def sync_data():
+    """Check the files, apply any new delta files and return the dataset version."""
+    if not os.path.exists(TX_PATH):
+        st.error(f"❌ transactions.csv not found at: {TX_PATH}")
         st.stop()
-    if not os.path.exists(cust_path):
-        st.error(f"❌ customers.csv not found at: {cust_path}")
+    if not os.path.exists(CUST_PATH):
+        st.error(f"❌ customers.csv not found at: {CUST_PATH}")
         st.stop()
+    refresh.refresh()
+    cache = transaction_cache()
+    cache.sync()
+    return f"{cache.key}:{charts.dataset_version(CUST_PATH)}"
 
-    df_tx = pd.read_csv(tx_path)
-    df_cust = pd.read_csv(cust_path)
+
+@st.cache_resource(max_entries=2)
+def load_data(version):
+    """
+    Merge the cached transactions with customers.csv for the current dataset
+    version. Shared across reruns and sessions (not copied): treat as read-only.
+    """
+    df_tx = transaction_cache().frame
+    df_cust = pd.read_csv(CUST_PATH)
 
     # Merge risk_score and pep_flag for analysis
     merged = df_tx.merge(
@@ -38,6 +61,33 @@ def load_data():
     )
     return merged
 
+
+@st.cache_resource(max_entries=2)
+def load_sample(version):
+    """Stratified sample (alert_type × risk_score) maintained at refresh time, with weights. Read-only."""
+    return transaction_cache().aggregates["sample"].frame()
+
+
+@st.cache_data(max_entries=4)
+def load_corridors(version, exact):
+    """Corridor counts by filter columns: kept up to date at refresh (exact) or from the sample."""
+    if exact:
+        return charts.corridor_table(transaction_cache().aggregates["corridor_counts"])
+    return charts.corridor_counts(load_sample(version), ["risk_score", "alert_type"], weight="weight")
+
+
+@st.cache_resource(max_entries=64)
+def corridor_map_figure(version, exact, risk_filter, flag_filter, country_filter):
+    """Corridor map per (dataset version, mode, filter state); reruns reuse the built figure."""
+    corridors = load_corridors(version, exact)
+    if risk_filter != "All":
+        corridors = corridors[corridors["risk_score"] == risk_filter]
+    if flag_filter != "All":
+        corridors = corridors[corridors["alert_type"] == metadata.alert_value(flag_filter)]
+    if country_filter != "All":
+        corridors = corridors[corridors["origin_country"] == country_filter]
+    return charts.corridor_map(corridors)
+
 # ----------------------------------------------------------
 # 2️⃣ Page Config
 # ----------------------------------------------------------
@@ -47,36 +97,49 @@ st.set_page_config(
 )
 st.title("💳 FinCrime Signals — Transactions Dashboard")
 
-df = load_data()
+# The sidebar draws from metadata.json as of the last refresh (plain json, no
+# frames), before pending deltas are applied; only a first run syncs first
+meta = metadata.load_metadata()
+if meta is None:
+    sync_data()
+    meta = transaction_cache().metadata
+version_caption = st.sidebar.empty()
+
+# Exact vs approximate mode: sampled estimates by default on large datasets
+exact_mode = st.sidebar.toggle(
+    "Exact mode",
+    value=meta["rows"] <= sampling.APPROX_ROW_THRESHOLD,
+    help=f"Above {sampling.APPROX_ROW_THRESHOLD:,} transactions the dashboard defaults to approximate "
+         "mode: stratified-sample estimates and HyperLogLog distinct counts with 95% error bars.",
+)
 
 # ----------------------------------------------------------
 # 3️⃣ Sidebar Filters
 # ----------------------------------------------------------
 st.sidebar.header("🔍 Filter Transactions")
 
-# Risk level filter
-risk_opts = ["All"] + sorted(df["risk_score"].dropna().unique().tolist())
-risk_filter = st.sidebar.selectbox("Risk Level", risk_opts)
-
-# Flag filter - Normalize alert_type to string and handle NaN
-df["alert_type"] = df["alert_type"].fillna("").astype(str)
-flag_opts = ["All"] + sorted(df["alert_type"].replace("", "Unflagged").unique().tolist())
+# Option lists come from the metadata (every row, both modes); alert_type is
+# normalized to "" for unflagged rows at refresh, shown as "Unflagged"
+risk_filter = st.sidebar.selectbox("Risk Level", ["All"] + meta["options"]["risk_score"])
+flag_filter = st.sidebar.selectbox("Alert Type", ["All"] + meta["options"]["alert_type"])
+country_filter = st.sidebar.selectbox("Origin Country", ["All"] + meta["options"]["origin_country"])
+unfiltered = risk_filter == flag_filter == country_filter == "All"
 
-flag_filter = st.sidebar.selectbox("Alert Type", flag_opts)
-
-# Country filter
-country_opts = ["All"] + sorted(df["origin_country"].dropna().unique().tolist())
-country_filter = st.sidebar.selectbox("Origin Country", country_opts)
+DATA_VERSION = sync_data()
+cache = transaction_cache()
+meta = cache.metadata  # counts for the synced version, precomputed at refresh time
+version_caption.caption(
+    f"🔄 Data version {cache.version} · {meta['rows']:,} rows · "
+    f"{meta['date_min'][:10]} → {meta['date_max'][:10]} · watermark {cache.watermark:%Y-%m-%d %H:%M}"
+)
+df = load_data(DATA_VERSION) if exact_mode else load_sample(DATA_VERSION)
 
-# Apply filters
-filtered = df.copy()
+# Apply filters (df is shared read-only; each filter step returns a new frame)
+filtered = df
 if risk_filter != "All":
     filtered = filtered[filtered["risk_score"] == risk_filter]
 if flag_filter != "All":
-    if flag_filter == "Unflagged":
-        filtered = filtered[filtered["alert_type"] == ""]
-    else:
-        filtered = filtered[filtered["alert_type"] == flag_filter]
+    filtered = filtered[filtered["alert_type"] == metadata.alert_value(flag_filter)]
 if country_filter != "All":
     filtered = filtered[filtered["origin_country"] == country_filter]
 
@@ -86,10 +149,38 @@ if country_filter != "All":
 st.subheader("📊 Summary Metrics")
 
 col1, col2, col3, col4 = st.columns(4)
-col1.metric("Transactions", f"{len(filtered):,}")
-col2.metric("Flagged", f"{filtered['is_flagged'].sum():,}")
-col3.metric("Unique Customers", f"{filtered['customer_id'].nunique():,}")
-col4.metric("Countries", f"{filtered['origin_country'].nunique():,}")
+if exact_mode and unfiltered:
+    col1.metric("Transactions", f"{meta['rows']:,}")
+    col2.metric("Flagged", f"{meta['flagged_rows']:,}")
+    col3.metric("Unique Customers", f"{meta['customers']:,}")
+    col4.metric("Countries", f"{len(meta['options']['origin_country']):,}")
+elif exact_mode:
+    col1.metric("Transactions", f"{len(filtered):,}")
+    col2.metric("Flagged", f"{filtered['is_flagged'].sum():,}")
+    col3.metric("Unique Customers", f"{filtered['customer_id'].nunique():,}")
+    col4.metric("Countries", f"{filtered['origin_country'].nunique():,}")
+else:
+    def approx_metric(col, label, estimate, stderr):
+        col.metric(label, f"≈{estimate:,.0f}", f"± {sampling.Z_95 * stderr:,.0f} (95%)", delta_color="off")
+
+    sketch_filters = dict(
+        risk_score=None if risk_filter == "All" else risk_filter,
+        alert_type=None if flag_filter == "All" else metadata.alert_value(flag_filter),
+        origin_country=None if country_filter == "All" else country_filter,
+    )
+    customer_hll = cache.aggregates["customer_hll"]
+    country_hll = cache.aggregates["country_hll"]
+    n_customers = customer_hll.estimate(**sketch_filters)
+    n_countries = country_hll.estimate(**sketch_filters)
+
+    approx_metric(col1, "Transactions", *sampling.estimate_total(filtered))
+    approx_metric(col2, "Flagged", *sampling.estimate_total(filtered[filtered["is_flagged"] == True]))
+    approx_metric(col3, "Unique Customers", n_customers, n_customers * customer_hll.relative_error)
+    approx_metric(col4, "Countries", n_countries, n_countries * country_hll.relative_error)
+    st.caption(
+        f"≈ Approximate mode: estimates from a {len(df):,}-row stratified sample of "
+        f"{len(cache.frame):,} transactions. Switch on **Exact mode** in the sidebar for exact figures."
+    )
 
 with st.expander("🧾 Preview Filtered Transactions"):
     st.dataframe(filtered.head(), use_container_width=True)
@@ -102,16 +193,31 @@ st.subheader("🚨 Alert Type Breakdown")
 if filtered.empty:
     st.warning("No transactions match your filters.")
 else:
-    alert_counts = (
-        filtered["alert_type"].replace("", "Unflagged").value_counts().reset_index()
-    )
-    alert_counts.columns = ["Alert Type", "Count"]
+    if exact_mode:
+        if unfiltered:
+            # Counted at refresh time (metadata.py), no regrouping of the full frame
+            alert_counts = pd.Series(meta["alert_counts"]).sort_values(ascending=False).reset_index()
+        else:
+            alert_counts = (
+                filtered["alert_type"].replace("", metadata.UNFLAGGED).value_counts().reset_index()
+            )
+        alert_counts.columns = ["Alert Type", "Count"]
+        error_y = None
+    else:
+        alert_counts = sampling.estimate_by(
+            filtered.assign(alert_label=filtered["alert_type"].replace("", metadata.UNFLAGGED)), by="alert_label"
+        )
+        alert_counts["Count"] = alert_counts["estimate"].round()
+        alert_counts["95% CI"] = sampling.Z_95 * alert_counts["stderr"]
+        alert_counts = alert_counts.rename(columns={"alert_label": "Alert Type"}).sort_values("Count", ascending=False)
+        error_y = "95% CI"
 
     fig_alert = px.bar(
         alert_counts,
         x="Alert Type",
         y="Count",
         color="Alert Type",
+        error_y=error_y,
         text_auto=True,
         title="Alert Type Frequency",
         color_discrete_sequence=px.colors.qualitative.Safe,
@@ -122,19 +228,27 @@ else:
 # 6️⃣ Transaction Volume by Risk
 # ----------------------------------------------------------
 st.subheader("💰 Transaction Volume by Risk Level")
-volume_stats = (
-    filtered.groupby("risk_score")["amount"]
-    .sum()
-    .reset_index()
-    .sort_values("amount", ascending=False)
-)
+if exact_mode:
+    volume_stats = (
+        filtered.groupby("risk_score")["amount_base"]
+        .sum()
+        .reset_index()
+        .sort_values("amount_base", ascending=False)
+    )
+    error_y = None
+else:
+    volume_stats = sampling.estimate_by(filtered, by="risk_score", values="amount_base")
+    volume_stats = volume_stats.rename(columns={"estimate": "amount_base"}).sort_values("amount_base", ascending=False)
+    volume_stats["95% CI"] = sampling.Z_95 * volume_stats["stderr"]
+    error_y = "95% CI"
 fig_volume = px.bar(
     volume_stats,
     x="risk_score",
-    y="amount",
+    y="amount_base",
     color="risk_score",
+    error_y=error_y,
     text_auto=".2s",
-    title="Total Transaction Value by Risk Level",
+    title=f"Total Transaction Value by Risk Level ({BASE_CURRENCY})",
     color_discrete_map={"Low": "lightgreen", "Medium": "orange", "High": "red"},
 )
 st.plotly_chart(fig_volume, use_container_width=True)
@@ -144,26 +258,7 @@ st.plotly_chart(fig_volume, use_container_width=True)
 # ----------------------------------------------------------
 st.subheader("🌍 Transaction Corridors (Origin → Destination)")
 
-country_corridors = (
-    filtered.groupby(["origin_country", "destination_country"])
-    .size()
-    .reset_index(name="Count")
-)
-
-fig_map = px.scatter_geo(
-    country_corridors,
-    locations="origin_country",
-    locationmode="country names",
-    color="Count",
-    hover_name="origin_country",
-    size="Count",
-    title="Transaction Volume by Origin Country",
-    projection="natural earth",
-)
-fig_map.update_layout(
-    geo=dict(showframe=False, showcoastlines=True, projection_type="natural earth"),
-    margin=dict(l=0, r=0, t=50, b=0),
-)
+fig_map = corridor_map_figure(DATA_VERSION, exact_mode, risk_filter, flag_filter, country_filter)
 st.plotly_chart(fig_map, use_container_width=True)
 
 # ----------------------------------------------------------
@@ -172,6 +267,8 @@ st.plotly_chart(fig_map, use_container_width=True)
 st.subheader("🧾 Flagged Transaction Details")
 
 flagged = filtered[filtered["is_flagged"] == True]
+if not exact_mode:
+    st.caption("≈ Showing sampled flagged transactions only.")
 if flagged.empty:
     st.info("No flagged transactions under current filters.")
 else:
@@ -184,6 +281,7 @@ else:
                 "destination_country",
                 "amount",
                 "currency",
+                "amount_base",
                 "alert_type",
                 "risk_score",
             ]
@@ -2,60 +2,126 @@
 # 🧩 FinCrime Signals — Investigator Case Review (Dropdown View)
 # ==========================================================
 import os
+import sys
 from datetime import datetime
 import pandas as pd
 import streamlit as st
-import plotly.express as px
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.insert(0, os.path.join(BASE_DIR, "scripts"))
+import case_store
+import case_export
+import charts
+import metadata
+import profiles
+import refresh
+from fx import BASE_CURRENCY
 
 # ----------------------------------------------------------
 # Load data
 # ----------------------------------------------------------
-@st.cache_data
-def load_data():
-    base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
-    tx_path = os.path.join(base_path, "data", "transactions.csv")
-    cust_path = os.path.join(base_path, "data", "customers.csv")
+TX_PATH = os.path.join(BASE_DIR, "data", "transactions.csv")
+CUST_PATH = os.path.join(BASE_DIR, "data", "customers.csv")
 
-    if not os.path.exists(tx_path) or not os.path.exists(cust_path):
-        st.error("❌ Missing CSV files in /data/. Generate them first.")
-        st.stop()
 
-    df_tx = pd.read_csv(tx_path)
-    df_cust = pd.read_csv(cust_path)
-    return df_tx, df_cust, base_path
+@st.cache_resource
+def transaction_cache():
+    return refresh.TransactionCache()
+
 
+def sync_data():
+    """Apply any new delta files and return the dataset version for cache keys."""
+    if not os.path.exists(TX_PATH) or not os.path.exists(CUST_PATH):
+        st.error("❌ Missing CSV files in /data/. Generate them first.")
+        st.stop()
+    refresh.refresh()
+    cache = transaction_cache()
+    cache.sync()
+    return f"{cache.key}:{charts.dataset_version(CUST_PATH)}"
+
+
+@st.cache_resource(max_entries=2)
+def load_data(version):
+    """Cached transactions + customers, shared across reruns (not copied): treat as read-only."""
+    df_tx = transaction_cache().frame
+    df_cust = pd.read_csv(CUST_PATH)
+    return df_tx, df_cust, BASE_DIR
+
+
+@st.cache_resource(max_entries=2)
+def flagged_cases(version):
+    """Flagged transactions joined with customer info and display fields, built once per version."""
+    df_tx, df_cust, _ = load_data(version)
+    flagged = df_tx[df_tx["is_flagged"] == True]
+    merged = flagged.merge(
+        df_cust[["customer_id", "risk_score", "jurisdiction_risk", "name"]],
+        on="customer_id", how="left"
+    )
+    # Risk levels as numbers (Low=1, Medium=2, High=3) for averaging
+    merged["risk_score_num"] = merged["risk_score"].map({"Low": 1, "Medium": 2, "High": 3})
+    merged["display_name"] = (
+        merged["name"].fillna("Unknown") +
+        " (" + merged["alert_type"] +
+        f", Risk: " + merged["risk_score"] +
+        f", Jurisdiction: " + merged["jurisdiction_risk"] + ")"
+    )
+    return merged
+
+
+@st.cache_resource
+def init_case_store():
+    return case_store.init_db()
+
+
+@st.cache_resource(max_entries=256)
+def customer_corridor_figure(version, cust_id):
+    """Per-customer corridor choropleth, built once per (dataset version, customer)."""
+    cust_tx = transaction_cache().customer_rows(cust_id)
+    return charts.corridor_choropleth(charts.corridor_counts(cust_tx, []))
+
+
+@st.cache_data(max_entries=2)
+def device_clusters(version):
+    """Per-customer shared-device cluster features for the current dataset version."""
+    risk_map = load_data(version)[1].drop_duplicates("customer_id").set_index("customer_id")["risk_score"]
+    return transaction_cache().aggregates["device_links"].features(risk_map)
 
-df_tx, df_cust, BASE_PATH = load_data()
-flagged = df_tx[df_tx["is_flagged"] == True].copy()
 
 st.set_page_config(page_title="FinCrime Signals — Case Review", layout="wide")
 st.title("🕵️ Investigator Case Review Form")
 
+# Filter options from metadata.json as of the last refresh (plain json, no
+# frames), so the sidebar draws before pending deltas are applied
+meta = metadata.load_metadata()
+if meta is None:
+    sync_data()
+    meta = transaction_cache().metadata
+case_options = meta["case_options"]
+
 # ----------------------------------------------------------
 # Sidebar Case Selector
 # ----------------------------------------------------------
 st.sidebar.header("🎯 Case Selection Filters")
 
-# Join transactions with customer info
-merged = flagged.merge(
-    df_cust[["customer_id", "risk_score", "jurisdiction_risk", "name"]],
-    on="customer_id", how="left"
-)
-
 # --- 1️⃣ Filter: Alert Type
-alert_types = ["All"] + sorted(merged["alert_type"].dropna().unique().tolist())
+alert_types = ["All"] + case_options["alert_type"]
 selected_alert = st.sidebar.selectbox("Alert Type", alert_types)
 
 # --- 2️⃣ Filter: Customer Risk Level
-risk_levels = ["All"] + sorted(merged["risk_score"].dropna().unique().tolist())
+risk_levels = ["All"] + case_options["risk_score"]
 selected_risk = st.sidebar.selectbox("Customer Risk Level", risk_levels)
 
 # --- 3️⃣ Filter: Jurisdiction Risk
-jur_risks = ["All"] + sorted(merged["jurisdiction_risk"].dropna().unique().tolist())
+jur_risks = ["All"] + case_options["jurisdiction_risk"]
 selected_jur = st.sidebar.selectbox("Jurisdiction Risk", jur_risks)
 
-# --- Apply Filters
-filtered = merged.copy()
+DATA_VERSION = sync_data()
+df_tx, df_cust, BASE_PATH = load_data(DATA_VERSION)
+init_case_store()
+merged = flagged_cases(DATA_VERSION)
+
+# --- Apply Filters (merged is shared read-only; each filter returns a new frame)
+filtered = merged
 if selected_alert != "All":
     filtered = filtered[filtered["alert_type"] == selected_alert]
 if selected_risk != "All":
@@ -69,12 +135,10 @@ if filtered.empty:
 
 # --- 🧮 Compute Summary Stats
 case_count = filtered["customer_id"].nunique()
-avg_amount = filtered["amount"].mean()
+avg_amount = filtered["amount_base"].mean()
 
-# Convert risk levels to numeric (Low=1, Medium=2, High=3) for averaging
-risk_map = {"Low": 1, "Medium": 2, "High": 3}
+# Average risk from the numeric levels (Low=1, Medium=2, High=3)
 inv_map = {1: "Low", 2: "Medium", 3: "High"}
-filtered["risk_score_num"] = filtered["risk_score"].map(risk_map)
 avg_risk_val = filtered["risk_score_num"].mean()
 avg_risk_label = inv_map[round(avg_risk_val)] if not pd.isna(avg_risk_val) else "N/A"
 
@@ -84,18 +148,13 @@ st.sidebar.markdown(f"""
 ### 📊 Case Summary
 **Matching Cases:** {case_count}  
 **Average Risk:** {avg_risk_label}  
-**Average Amount:** €{avg_amount:,.2f}
+**Average Amount:** {avg_amount:,.2f} {BASE_CURRENCY}
 """)
 st.sidebar.markdown("---")
 
-# --- Build Dropdown Case List
-filtered["display_name"] = (
-    filtered["name"].fillna("Unknown") +
-    " (" + filtered["alert_type"] +
-    f", Risk: " + filtered["risk_score"] +
-    f", Jurisdiction: " + filtered["jurisdiction_risk"] + ")"
-)
+investigator = st.sidebar.text_input("Investigator", value="Analyst (You)")
 
+# --- Build Dropdown Case List (display_name precomputed in flagged_cases)
 # Deduplicate customer-alert pairs
 case_list = (
     filtered.groupby(["customer_id", "alert_type", "display_name"])
@@ -114,20 +173,28 @@ alert_type = selected_case["alert_type"]
 # Case & Customer Context
 # ----------------------------------------------------------
 cust = df_cust[df_cust["customer_id"] == cust_id].squeeze()
-cust_tx = df_tx[df_tx["customer_id"] == cust_id].copy()
+cust_tx = transaction_cache().customer_rows(cust_id).copy()
 cust_tx["timestamp"] = pd.to_datetime(cust_tx["timestamp"], errors="coerce")
 
+# New alerts of this type after the case was closed reopen it
+last_alert = cust_tx.loc[cust_tx["alert_type"] == alert_type, "timestamp"].max()
+case = case_store.open_case(
+    cust_id, alert_type, investigator,
+    last_alert_at=None if pd.isna(last_alert) else last_alert.isoformat(timespec="seconds"),
+)
+case_id = case["case_id"]
+status_icons = {"Open": "🟠", "Escalated": "🔴", "Closed": "🟢"}
+
 st.divider()
 st.header(f"📁 Case Metadata — {cust_id}")
-case_id = f"CASE-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
 col1, col2, col3 = st.columns(3)
 col1.metric("Case ID", case_id)
 col2.metric("Alert Type", alert_type)
-col3.metric("Status", "🟠 Open")
+col3.metric("Status", f"{status_icons.get(case['status'], '⚪')} {case['status']}")
 
 st.markdown(f"""
-**Date Opened:** {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}  
-**Assigned Investigator:** Analyst (You)  
+**Date Opened:** {case["opened_at"].replace("T", " ")}  
+**Assigned Investigator:** {case["investigator"] or investigator}  
 **Customer Name:** {cust['name']}  
 **Customer Risk Level:** {cust['risk_score']}  
 **Jurisdiction Risk:** {cust['jurisdiction_risk']}  
@@ -147,32 +214,80 @@ colB.write(f"**Device Count:** {cust['device_count']}")
 colC.write(f"**Join Date:** {cust['join_date']}")
 st.divider()
 
+# ----------------------------------------------------------
+# 🔗 Device Linkage
+# ----------------------------------------------------------
+st.subheader("🔗 Device Linkage")
+clusters = device_clusters(DATA_VERSION)
+device_links = transaction_cache().aggregates["device_links"]
+
+if cust_id in clusters.index:
+    cluster = clusters.loc[cust_id]
+    d1, d2, d3, d4 = st.columns(4)
+    d1.metric("Cluster", cluster["cluster_id"])
+    d2.metric("Cluster Size", int(cluster["cluster_size"]))
+    d3.metric("Devices in Cluster", int(cluster["cluster_devices"]))
+    d4.metric("Cluster Risk", f"{cluster['cluster_risk']} ({int(cluster['cluster_high_risk'])} High)")
+
+    linked = device_links.linked_customers(cust_id).merge(
+        df_cust[["customer_id", "name", "risk_score", "pep_flag"]], on="customer_id", how="left"
+    )
+    if linked.empty:
+        st.caption("No other customers share this customer's devices.")
+    else:
+        st.dataframe(linked, hide_index=True, use_container_width=True)
+else:
+    st.caption("No device data for this customer.")
+st.divider()
+
 # ----------------------------------------------------------
 # 💰 Transactional Behavior
 # ----------------------------------------------------------
 st.subheader("💰 Transactional Behavior Summary")
 
 total_tx = len(cust_tx)
-avg_amount = cust_tx["amount"].mean()
+avg_amount = cust_tx["amount_base"].mean()
 corridors = cust_tx["destination_country"].nunique()
 flagged_ratio = (cust_tx["is_flagged"].mean()) * 100
 
 c1, c2, c3, c4 = st.columns(4)
 c1.metric("Total Transactions", total_tx)
-c2.metric("Avg. Amount", f"${avg_amount:,.2f}")
+c2.metric(f"Avg. Amount ({BASE_CURRENCY})", f"{avg_amount:,.2f}")
 c3.metric("Corridors", corridors)
 c4.metric("Flagged %", f"{flagged_ratio:.1f}%")
 
-agg = cust_tx.groupby("destination_country")["amount"].sum().reset_index()
-fig = px.choropleth(
-    agg,
-    locations="destination_country",
-    locationmode="country names",
-    color="amount",
-    title="🌎 Aggregated Transaction Corridors",
-    color_continuous_scale="Reds",
-)
+fig = customer_corridor_figure(DATA_VERSION, cust_id)
 st.plotly_chart(fig, use_container_width=True)
+
+# ----------------------------------------------------------
+# 📈 Behavioral Baseline
+# ----------------------------------------------------------
+st.subheader("📈 Behavioral Baseline")
+baseline = transaction_cache().aggregates["profiles"].profile(cust_id)
+if baseline is None or baseline["tx_count"] == 0:
+    st.caption("No recent activity to build a baseline from.")
+else:
+    st.caption(f"Rolling {profiles.PROFILE_WINDOW_WEEKS}-week profile; each transaction is scored against the baseline before it.")
+    b1, b2, b3, b4 = st.columns(4)
+    b1.metric(f"Mean Amount ({BASE_CURRENCY})", f"{baseline['amount_mean']:,.2f}")
+    b2.metric("Std. Dev.", f"{baseline['amount_std']:,.2f}")
+    b3.metric("Tx / Week", f"{baseline['tx_per_week']:.2f}")
+    b4.metric("Known Corridors", len(baseline["destinations"]))
+    st.markdown(f"""
+**Typical Channels:** {", ".join(baseline["channels"]) or "—"}  
+**Known Destinations:** {", ".join(baseline["destinations"]) or "—"}
+""")
+
+    deviations = cust_tx[cust_tx["deviation_score"] > 0].nlargest(5, "deviation_score")
+    if not deviations.empty:
+        st.markdown("**Largest deviations from baseline**")
+        st.dataframe(
+            deviations[[
+                "timestamp", "amount_base", "channel", "destination_country",
+                "amount_z", "new_corridor", "new_channel", "deviation_score",
+            ]],
+            hide_index=True, use_container_width=True,
+        )
 st.divider()
 
 # ----------------------------------------------------------
@@ -200,12 +315,70 @@ st.divider()
 # ----------------------------------------------------------
 st.subheader("🧾 Analyst Findings & Decision")
 summary = st.text_area("Summary of Findings", placeholder="Summarize key findings and anomalies...")
-decision = st.selectbox("Final Decision", ["Pending","Cleared","Escalated","SAR Filed"])
+decision = st.selectbox("Final Decision", case_store.DECISIONS)
 confidence = st.slider("Confidence Level", 0,100,75)
 followup = st.radio("Follow-Up Required?", ["No","Yes"])
 notes = st.text_area("Reviewer Notes", placeholder="Add rationale or escalation instructions...")
+
+if st.button("💾 Save Decision"):
+    case_store.record_decision(
+        case_id,
+        investigator=investigator,
+        decision=decision,
+        confidence=confidence,
+        followup=followup == "Yes",
+        typologies=selected_typologies,
+        summary=summary,
+        notes=notes,
+    )
+    # Rerun so the status metric above shows the new status; the message survives it
+    st.session_state["decision_saved"] = f"✅ Decision '{decision}' saved to {case_id}"
+    st.rerun()
+if "decision_saved" in st.session_state:
+    st.success(st.session_state.pop("decision_saved"))
+
+history = case_store.decision_history(case_id)
+with st.expander(f"🗂️ Decision History ({len(history)})"):
+    if not history:
+        st.info("No decisions recorded for this case yet.")
+    else:
+        st.dataframe(pd.DataFrame(history).drop(columns=["decision_id", "case_id"]), use_container_width=True)
 st.divider()
 
+# ----------------------------------------------------------
+# 📂 Open Cases
+# ----------------------------------------------------------
+with st.expander("📂 Open Cases"):
+    mine_only = st.checkbox("Only my cases")
+    open_cases = case_store.list_open_cases(investigator=investigator if mine_only else None)
+    if not open_cases:
+        st.info("No open cases.")
+    else:
+        st.dataframe(pd.DataFrame(open_cases), use_container_width=True)
+
+# ----------------------------------------------------------
+# 📦 Batch Export (all cases matching the sidebar filters)
+# ----------------------------------------------------------
+with st.expander("📦 Batch Export Case Packs"):
+    st.caption(f"{len(case_list)} cases match the current filters. Unchanged cases since the last export are skipped.")
+    exp_col1, exp_col2 = st.columns(2)
+    export_format = exp_col1.selectbox("Format", case_export.FORMATS, format_func=str.upper)
+    force_export = exp_col2.checkbox("Re-export unchanged cases")
+    if st.button("📦 Export Case Packs"):
+        packs = case_export.build_case_packs(df_tx, df_cust, cases=case_list)
+        bar = st.progress(0.0, text="Rendering case packs...")
+
+        def report(done, total):
+            bar.progress(done / total if total else 1.0, text=f"Rendered {done}/{total} case packs")
+
+        result = case_export.export_cases(packs, fmt=export_format, force=force_export, progress=report)
+        st.success(f"✅ Exported {result['exported']} case packs ({result['skipped']} unchanged, skipped)")
+        if result["failed"]:
+            st.warning(f"⚠️ {len(result['failed'])} case pack(s) failed to render and were left out")
+            st.dataframe(pd.DataFrame(list(result["failed"].items()), columns=["case_id", "error"]), use_container_width=True)
+        with open(result["path"], "rb") as f:
+            st.download_button("⬇️ Download Archive", f.read(), file_name=os.path.basename(result["path"]), mime="application/zip")
+
 # ----------------------------------------------------------
 # 📄 Case Summary Preview
 # ----------------------------------------------------------
@@ -0,0 +1,344 @@
+# ==========================================================
+# 📦 FinCrime Signals — case_export.py
+# ----------------------------------------------------------
+# Batch export of case packs for regulators
+# - One pack per case: profile, transaction history,
+#   corridor chart and latest decision
+# - PDF (reportlab) or CSV, rendered in a process pool
+# - Results streamed into a single zip archive
+# - Unchanged cases skipped via content hash manifest
+# ==========================================================
+
+import os
+import io
+import csv
+import json
+import zipfile
+import hashlib
+import argparse
+from datetime import datetime
+from xml.sax.saxutils import escape
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import refresh
+import case_store
+from fx import BASE_CURRENCY
+
+# -------------------------------
+# Paths (robust to working dir)
+# -------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CUST_PATH = os.path.join(BASE_DIR, "data", "customers.csv")
+EXPORT_DIR = os.path.join(BASE_DIR, "data", "exports")
+MANIFEST_PATH = os.path.join(EXPORT_DIR, "manifest.json")
+
+FORMATS = ("pdf", "csv")
+
+PROFILE_FIELDS = [
+    "name", "dob", "nationality", "residency_country", "jurisdiction_risk",
+    "account_type", "occupation", "source_of_funds", "pep_flag",
+    "screening_result", "device_count", "join_date", "kyc_status", "risk_score",
+]
+TX_FIELDS = [
+    "timestamp", "transaction_id", "amount", "currency", "amount_base", "origin_country",
+    "destination_country", "channel", "transaction_type", "alert_type",
+]
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# -------------------------------------------
+# Case packs (plain dicts so they pickle cheaply to workers)
+# -------------------------------------------
+def _plain(value):
+    """
+    Fixed JSON form for pack values, so a case hashes the same whether the
+    frame came from the CSV (string timestamps) or the typed cache.
+    """
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.strftime(TIMESTAMP_FORMAT)
+    if isinstance(value, np.generic):
+        return value.item()
+    if not isinstance(value, str) and pd.isna(value):
+        return None
+    return value
+
+
+def build_case_packs(df_tx: pd.DataFrame, df_cust: pd.DataFrame, cases: pd.DataFrame = None) -> list:
+    """
+    One pack per (customer_id, alert_type) case. `cases` defaults to every
+    flagged customer/alert pair in the transactions.
+    """
+    if cases is None:
+        flagged = df_tx[df_tx["is_flagged"] == True]
+        cases = flagged[["customer_id", "alert_type"]].drop_duplicates()
+
+    cust_by_id = df_cust.drop_duplicates("customer_id").set_index("customer_id")
+    tx_by_cust = {cid: g for cid, g in df_tx.groupby("customer_id", sort=False)}
+
+    packs = []
+    for cust_id, alert_type in cases[["customer_id", "alert_type"]].itertuples(index=False):
+        case_id = case_store.case_id_for(cust_id, alert_type)
+        case = case_store.get_case(case_id) or {}
+        history = case_store.decision_history(case_id) if case else []
+
+        cust_tx = tx_by_cust.get(cust_id, df_tx.iloc[0:0]).sort_values("timestamp")
+        history_rows = cust_tx[[c for c in TX_FIELDS if c in cust_tx.columns]].assign(
+            timestamp=pd.to_datetime(cust_tx["timestamp"]).dt.strftime(TIMESTAMP_FORMAT)
+        )
+        corridors = (
+            cust_tx.groupby("destination_country")["amount_base"].sum()
+            .sort_values(ascending=False).round(2)
+        )
+        profile = {}
+        if cust_id in cust_by_id.index:
+            profile = {f: cust_by_id.at[cust_id, f] for f in PROFILE_FIELDS if f in cust_by_id.columns}
+
+        packs.append({
+            "case_id": case_id,
+            "customer_id": cust_id,
+            "alert_type": alert_type,
+            "status": case.get("status", "Open"),
+            "investigator": case.get("investigator"),
+            "profile": {k: _plain(v) for k, v in profile.items()},
+            "transactions": [
+                {k: _plain(v) for k, v in row.items()}
+                for row in history_rows.fillna("").to_dict(orient="records")
+            ],
+            "corridors": {k: _plain(v) for k, v in corridors.items()},
+            "decision": history[0] if history else None,
+        })
+    return packs
+
+
+def pack_hash(pack: dict, fmt: str) -> str:
+    """Content hash of everything that ends up in the rendered report."""
+    payload = json.dumps(pack, sort_keys=True, default=str)
+    return hashlib.sha256(f"{fmt}|{payload}".encode("utf-8")).hexdigest()
+
+# -------------------------------------------
+# Renderers (run inside worker processes)
+# -------------------------------------------
+def _render_csv(pack: dict) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(["section", "field", "value"])
+    for key in ("case_id", "customer_id", "alert_type", "status", "investigator"):
+        writer.writerow(["case", key, pack[key]])
+    for key, val in pack["profile"].items():
+        writer.writerow(["profile", key, val])
+    decision = pack["decision"] or {}
+    for key in ("decided_at", "investigator", "decision", "confidence", "followup", "typologies", "summary", "notes"):
+        writer.writerow(["decision", key, decision.get(key, "")])
+    for country, amount in pack["corridors"].items():
+        writer.writerow(["corridor", country, amount])
+    writer.writerow([])
+    if pack["transactions"]:
+        tx_writer = csv.DictWriter(buf, fieldnames=list(pack["transactions"][0].keys()))
+        tx_writer.writeheader()
+        tx_writer.writerows(pack["transactions"])
+    return buf.getvalue().encode("utf-8")
+
+
+def _corridor_chart(corridors: dict, width: float, max_bars: int = 12):
+    from reportlab.lib import colors
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.graphics.charts.barcharts import HorizontalBarChart
+
+    items = list(corridors.items())[:max_bars]
+    height = 30 + 18 * max(len(items), 1)
+    drawing = Drawing(width, height)
+    chart = HorizontalBarChart()
+    chart.x, chart.y = 120, 15
+    chart.width, chart.height = width - 140, height - 25
+    chart.data = [[amt for _, amt in reversed(items)] or [0]]
+    chart.categoryAxis.categoryNames = [c for c, _ in reversed(items)] or ["—"]
+    chart.categoryAxis.labels.fontSize = 7
+    chart.valueAxis.labels.fontSize = 7
+    chart.valueAxis.valueMin = 0
+    chart.bars[0].fillColor = colors.HexColor("#e63946")
+    drawing.add(chart)
+    return drawing
+
+
+def _markup(value) -> str:
+    """Free text as Paragraph markup: escaped, line breaks kept."""
+    return escape(str(value)).replace("\n", "<br/>")
+
+
+def _render_pdf(pack: dict) -> bytes:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4, title=pack["case_id"])
+    grid = TableStyle([
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("FONTSIZE", (0, 0), (-1, -1), 7),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e0bbff")),
+    ])
+
+    story = [
+        Paragraph(f"Case Pack — {_markup(pack['case_id'])}", styles["Title"]),
+        Paragraph(
+            f"Customer: {_markup(pack['profile'].get('name', 'Unknown'))} ({_markup(pack['customer_id'])})<br/>"
+            f"Alert Type: {_markup(pack['alert_type'])} &nbsp; Status: {_markup(pack['status'])} &nbsp; "
+            f"Investigator: {_markup(pack['investigator'] or 'Unassigned')}",
+            styles["Normal"],
+        ),
+        Spacer(1, 10),
+        Paragraph("Customer Profile", styles["Heading2"]),
+        Table([["Field", "Value"]] + [[k, str(v)] for k, v in pack["profile"].items()], style=grid),
+        Spacer(1, 10),
+        Paragraph("Decision", styles["Heading2"]),
+    ]
+
+    decision = pack["decision"]
+    if decision:
+        story.append(Table(
+            [["Field", "Value"]] + [
+                ["Decided At", decision["decided_at"]],
+                ["Investigator", decision["investigator"]],
+                ["Decision", decision["decision"]],
+                ["Confidence", f"{decision['confidence']}%"],
+                ["Follow-Up", "Yes" if decision["followup"] else "No"],
+                ["Typologies", ", ".join(decision["typologies"]) or "None selected"],
+            ],
+            style=grid,
+        ))
+        story.append(Paragraph(f"<b>Findings:</b> {_markup(decision['summary'] or 'No findings provided.')}", styles["Normal"]))
+        story.append(Paragraph(f"<b>Reviewer Notes:</b> {_markup(decision['notes'] or 'N/A')}", styles["Normal"]))
+    else:
+        story.append(Paragraph("No decision recorded.", styles["Normal"]))
+
+    story += [
+        Spacer(1, 10),
+        Paragraph(f"Transaction Corridors (total {BASE_CURRENCY} by destination)", styles["Heading2"]),
+        _corridor_chart(pack["corridors"], doc.width),
+        Spacer(1, 10),
+        Paragraph(f"Transaction History ({len(pack['transactions'])})", styles["Heading2"]),
+    ]
+    if pack["transactions"]:
+        cols = list(pack["transactions"][0].keys())
+        rows = [[str(tx[c]) for c in cols] for tx in pack["transactions"]]
+        story.append(Table([cols] + rows, style=grid, repeatRows=1))
+
+    story.append(Spacer(1, 10))
+    story.append(Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles["Italic"]))
+    doc.build(story)
+    return buf.getvalue()
+
+
+def render_case(pack: dict, fmt: str) -> tuple:
+    """Worker entry point: returns (case_id, archive member name, report bytes)."""
+    data = _render_pdf(pack) if fmt == "pdf" else _render_csv(pack)
+    return pack["case_id"], f"{pack['case_id']}.{fmt}", data
+
+# -------------------------------------------
+# Manifest (content hashes from the last export)
+# -------------------------------------------
+def load_manifest(path: str = MANIFEST_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict, path: str = MANIFEST_PATH) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+# -------------------------------------------
+# Batch export
+# -------------------------------------------
+def export_cases(
+    packs: list,
+    fmt: str = "pdf",
+    out_path: str = None,
+    workers: int = None,
+    force: bool = False,
+    progress=None,
+    manifest_path: str = MANIFEST_PATH,
+) -> dict:
+    """
+    Render `packs` in a process pool and stream each report into a zip
+    archive as soon as it is ready. Cases whose content hash matches the
+    last export are skipped unless `force`. `progress(done, total)` is
+    called after every finished report. A case that fails to render is
+    reported under "failed" (case_id -> error) and the batch carries on.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Expected one of: {FORMATS}")
+    if out_path is None:
+        out_path = os.path.join(EXPORT_DIR, f"case_packs_{datetime.now().strftime('%Y%m%d-%H%M%S')}.zip")
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    manifest = load_manifest(manifest_path)
+    hashes = {p["case_id"]: pack_hash(p, fmt) for p in packs}
+    todo = [p for p in packs if force or manifest.get(f"{fmt}:{p['case_id']}") != hashes[p["case_id"]]]
+    skipped = len(packs) - len(todo)
+
+    total = len(todo)
+    if progress:
+        progress(0, total)
+    done, failed = 0, {}
+    with zipfile.ZipFile(out_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        if todo:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(render_case, p, fmt): p["case_id"] for p in todo}
+                for fut in as_completed(futures):
+                    try:
+                        case_id, member, data = fut.result()
+                    except Exception as exc:
+                        failed[futures[fut]] = f"{type(exc).__name__}: {exc}"
+                    else:
+                        zf.writestr(member, data)
+                        manifest[f"{fmt}:{case_id}"] = hashes[case_id]
+                        done += 1
+                    if progress:
+                        progress(done + len(failed), total)
+        zf.writestr("index.json", json.dumps({
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "format": fmt,
+            "exported": sorted(p["case_id"] for p in todo if p["case_id"] not in failed),
+            "skipped_unchanged": skipped,
+            "failed": failed,
+        }, indent=2))
+
+    save_manifest(manifest, manifest_path)
+    return {"path": out_path, "exported": done, "skipped": skipped, "failed": failed}
+
+# -------------------------------------------
+# Main
+# -------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export case packs for flagged customers.")
+    parser.add_argument("--format", choices=FORMATS, default="pdf")
+    parser.add_argument("--out", default=None, help="Zip archive path (default: data/exports/...)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="Re-export cases even if unchanged")
+    args = parser.parse_args()
+
+    # Same data the dashboards see: base CSV plus applied deltas
+    refresh.refresh()
+    cache = refresh.TransactionCache()
+    cache.sync()
+    case_store.init_db()
+    packs = build_case_packs(cache.frame, pd.read_csv(CUST_PATH))
+
+    def report(done, total):
+        print(f"\r  rendered {done}/{total}", end="", flush=True)
+
+    result = export_cases(packs, fmt=args.format, out_path=args.out, workers=args.workers,
+                          force=args.force, progress=report)
+    print()
+    print(f"✅ Exported {result['exported']} case packs ({result['skipped']} unchanged, skipped) -> {result['path']}")
+    for case_id, error in sorted(result["failed"].items()):
+        print(f"⚠️ {case_id} failed to render: {error}")
@@ -0,0 +1,301 @@
+# ==========================================================
+# 🗂️ FinCrime Signals — case_store.py
+# ----------------------------------------------------------
+# Durable case store for the investigator case review page
+# - Embedded SQLite database (data/cases.db) in WAL mode
+# - Stable case IDs derived from (customer_id, alert_type)
+# - Append-only decision history (UPDATE/DELETE blocked)
+# - Indexed lookups by status, investigator and customer
+# ==========================================================
+
+import os
+import json
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+from datetime import datetime
+
+# -------------------------------
+# Paths (robust to working dir)
+# -------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(BASE_DIR, "data", "cases.db")
+
+DECISIONS = ["Pending", "Cleared", "Escalated", "SAR Filed"]
+
+# Case status follows the latest decision recorded against it
+STATUS_BY_DECISION = {
+    "Pending": "Open",
+    "Escalated": "Escalated",
+    "Cleared": "Closed",
+    "SAR Filed": "Closed",
+}
+OPEN_STATUSES = ("Open", "Escalated")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cases (
+    case_id       TEXT PRIMARY KEY,
+    customer_id   TEXT NOT NULL,
+    alert_type    TEXT NOT NULL,
+    status        TEXT NOT NULL DEFAULT 'Open',
+    investigator  TEXT,
+    opened_at     TEXT NOT NULL,
+    updated_at    TEXT NOT NULL,
+    UNIQUE (customer_id, alert_type)
+);
+
+CREATE TABLE IF NOT EXISTS case_decisions (
+    decision_id   INTEGER PRIMARY KEY AUTOINCREMENT,
+    case_id       TEXT NOT NULL REFERENCES cases(case_id),
+    decided_at    TEXT NOT NULL,
+    investigator  TEXT NOT NULL,
+    decision      TEXT NOT NULL,
+    confidence    INTEGER,
+    followup      INTEGER NOT NULL DEFAULT 0,
+    typologies    TEXT NOT NULL DEFAULT '[]',
+    summary       TEXT,
+    notes         TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_cases_status ON cases(status, updated_at DESC, case_id DESC);
+CREATE INDEX IF NOT EXISTS idx_cases_investigator ON cases(investigator, status, updated_at DESC, case_id DESC);
+CREATE INDEX IF NOT EXISTS idx_cases_customer ON cases(customer_id);
+CREATE INDEX IF NOT EXISTS idx_cases_open ON cases(updated_at DESC, case_id DESC) WHERE status IN ('Open', 'Escalated');
+CREATE INDEX IF NOT EXISTS idx_decisions_case ON case_decisions(case_id, decision_id);
+
+-- Decision history is append-only: corrections are new rows, never edits
+CREATE TRIGGER IF NOT EXISTS trg_decisions_no_update
+BEFORE UPDATE ON case_decisions
+BEGIN
+    SELECT RAISE(ABORT, 'case_decisions is append-only');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_decisions_no_delete
+BEFORE DELETE ON case_decisions
+BEGIN
+    SELECT RAISE(ABORT, 'case_decisions is append-only');
+END;
+"""
+
+# Bump when index definitions change: init_db drops and recreates these
+SCHEMA_VERSION = 2
+REBUILT_INDEXES = ["idx_cases_status", "idx_cases_investigator", "idx_cases_open"]
+
+# -------------------------------------------
+# Connections
+# -------------------------------------------
+@contextmanager
+def connect(db_path: str = DB_PATH):
+    """
+    Short-lived connection per operation.
+    WAL lets readers run alongside a single writer; busy_timeout makes
+    concurrent writers queue briefly instead of failing with 'database is locked'.
+    """
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.execute("PRAGMA foreign_keys=ON")
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def write_transaction(conn: sqlite3.Connection):
+    """
+    Take the write lock up front (BEGIN IMMEDIATE) so two analysts never
+    deadlock upgrading read locks; keep the body small.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def init_db(db_path: str = DB_PATH) -> str:
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    with connect(db_path) as conn:
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            for name in REBUILT_INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+        conn.executescript(SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return db_path
+
+# -------------------------------------------
+# Case IDs
+# -------------------------------------------
+def case_id_for(customer_id: str, alert_type: str) -> str:
+    """Stable case ID: same customer + alert type always maps to the same case."""
+    digest = hashlib.sha1(f"{customer_id}|{alert_type}".encode("utf-8")).hexdigest()
+    return f"CASE-{digest[:12].upper()}"
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+# -------------------------------------------
+# Cases
+# -------------------------------------------
+def get_case(case_id: str, db_path: str = DB_PATH) -> dict | None:
+    with connect(db_path) as conn:
+        row = conn.execute("SELECT * FROM cases WHERE case_id = ?", (case_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def open_case(
+    customer_id: str,
+    alert_type: str,
+    investigator: str = None,
+    last_alert_at: str = None,
+    db_path: str = DB_PATH,
+) -> dict:
+    """
+    Return the case for (customer_id, alert_type), creating it on first sight.
+    A Closed case is reopened when `last_alert_at` (ISO timestamp of the
+    latest alert of this type) is after the case was last updated.
+    """
+    case_id = case_id_for(customer_id, alert_type)
+    # Read first: reruns of the review page should not take the write lock
+    case = get_case(case_id, db_path)
+    if case is not None:
+        if case["status"] == "Closed" and last_alert_at and last_alert_at > case["updated_at"]:
+            with connect(db_path) as conn, write_transaction(conn):
+                conn.execute(
+                    "UPDATE cases SET status = 'Open', updated_at = ? "
+                    "WHERE case_id = ? AND status = 'Closed' AND updated_at < ?",
+                    (_now(), case_id, last_alert_at),
+                )
+            return get_case(case_id, db_path)
+        return case
+
+    now = _now()
+    with connect(db_path) as conn, write_transaction(conn):
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO cases
+                (case_id, customer_id, alert_type, status, investigator, opened_at, updated_at)
+            VALUES (?, ?, ?, 'Open', ?, ?, ?)
+            """,
+            (case_id, customer_id, alert_type, investigator, now, now),
+        )
+    return get_case(case_id, db_path)
+
+
+def record_decision(
+    case_id: str,
+    investigator: str,
+    decision: str,
+    confidence: int = None,
+    followup: bool = False,
+    typologies: list = None,
+    summary: str = "",
+    notes: str = "",
+    db_path: str = DB_PATH,
+) -> int:
+    """Append a decision to the case history and move the case status along with it."""
+    if decision not in STATUS_BY_DECISION:
+        raise ValueError(f"Unknown decision '{decision}'. Expected one of: {DECISIONS}")
+
+    now = _now()
+    with connect(db_path) as conn, write_transaction(conn):
+        # Update first: with foreign keys on, an unknown case would fail the insert instead
+        updated = conn.execute(
+            "UPDATE cases SET status = ?, investigator = ?, updated_at = ? WHERE case_id = ?",
+            (STATUS_BY_DECISION[decision], investigator, now, case_id),
+        )
+        if updated.rowcount == 0:
+            raise KeyError(f"Case not found: {case_id}")
+        cur = conn.execute(
+            """
+            INSERT INTO case_decisions
+                (case_id, decided_at, investigator, decision, confidence, followup, typologies, summary, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                case_id, now, investigator, decision, confidence, int(bool(followup)),
+                json.dumps(typologies or []), summary, notes,
+            ),
+        )
+    return cur.lastrowid
+
+
+def decision_history(case_id: str, db_path: str = DB_PATH) -> list:
+    """All decisions for a case, newest first."""
+    with connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT * FROM case_decisions WHERE case_id = ? ORDER BY decision_id DESC",
+            (case_id,),
+        ).fetchall()
+    history = []
+    for row in rows:
+        item = dict(row)
+        item["typologies"] = json.loads(item["typologies"])
+        item["followup"] = bool(item["followup"])
+        history.append(item)
+    return history
+
+
+def list_cases(
+    status=None,
+    investigator: str = None,
+    customer_id: str = None,
+    limit: int = 100,
+    before: tuple = None,
+    db_path: str = DB_PATH,
+) -> list:
+    """
+    Most recently updated cases first. `status` may be a single status or a
+    list of them. Page with `before=(updated_at, case_id)` of the last row
+    (keyset paging; case_id breaks ties between rows updated in the same
+    second) so every page is an index range scan regardless of table size.
+    """
+    clauses, params, source = [], [], "cases"
+    if status:
+        statuses = [status] if isinstance(status, str) else list(status)
+        if sorted(statuses) == sorted(OPEN_STATUSES):
+            # Literal predicate so the planner can pick the partial open-cases index
+            clauses.append("status IN ('Open', 'Escalated')")
+            if not investigator and not customer_id:
+                # Left alone it picks idx_cases_status and sorts every open case per page
+                source = "cases INDEXED BY idx_cases_open"
+        else:
+            clauses.append(f"status IN ({','.join('?' * len(statuses))})")
+            params.extend(statuses)
+    if investigator:
+        clauses.append("investigator = ?")
+        params.append(investigator)
+    if customer_id:
+        clauses.append("customer_id = ?")
+        params.append(customer_id)
+    if before:
+        clauses.append("(updated_at, case_id) < (?, ?)")
+        params.extend(before)
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"SELECT * FROM {source} {where} ORDER BY updated_at DESC, case_id DESC LIMIT ?"
+    params.append(int(limit))
+    with connect(db_path) as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [dict(r) for r in rows]
+
+
+def list_open_cases(investigator: str = None, limit: int = 100, db_path: str = DB_PATH) -> list:
+    return list_cases(status=OPEN_STATUSES, investigator=investigator, limit=limit, db_path=db_path)
+
+# -------------------------------------------
+# Main
+# -------------------------------------------
+if __name__ == "__main__":
+    init_db()
+    open_cases = list_open_cases(limit=20)
+    print(f"✅ Case store ready -> {DB_PATH}")
+    print(f"Open cases (latest {len(open_cases)}):")
+    for c in open_cases:
+        print(f"  {c['case_id']}  {c['status']:<10} {c['alert_type']:<20} {c['investigator'] or '-'}")
@@ -0,0 +1,142 @@
+# ==========================================================
+# 🗺️ FinCrime Signals — charts.py
+# ----------------------------------------------------------
+# Geographic figure builders shared by the dashboards
+# - Corridors pre-aggregated once per dataset version (or
+#   read from the counts refresh.py keeps per batch)
+# - ISO-3 locations (see geo.py) instead of country names
+# - Origin → destination flow lines for the corridor view
+# Pages cache the returned figures keyed by
+# (dataset_version, filter state). Plotly is imported by the
+# figure builders only, so aggregation-only callers skip it.
+# ==========================================================
+
+import os
+import hashlib
+from typing import TYPE_CHECKING
+
+import pandas as pd
+
+from geo import to_iso3
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+MAP_LAYOUT = {
+    "geo": {"showframe": False, "showcoastlines": True, "projection_type": "natural earth"},
+    "margin": {"l": 0, "r": 0, "t": 50, "b": 0},
+}
+
+# -------------------------------------------
+# Dataset version
+# -------------------------------------------
+def dataset_version(*paths: str) -> str:
+    """Cheap version key from file size + mtime; changes whenever a file is rewritten."""
+    parts = []
+    for path in paths:
+        if not os.path.exists(path):
+            parts.append(f"{path}:missing")
+            continue
+        st = os.stat(path)
+        parts.append(f"{path}:{st.st_size}:{st.st_mtime_ns}")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:12]
+
+# -------------------------------------------
+# Pre-aggregation
+# -------------------------------------------
+def corridor_counts(df: pd.DataFrame, keys: list, weight: str = None, value: str = "amount_base") -> pd.DataFrame:
+    """
+    Corridor counts and amounts (sum of `value`, base currency by default)
+    grouped by `keys` (the filter columns) plus origin/destination. Built once
+    per dataset version; filtering this table is much cheaper than regrouping
+    the raw transactions on every rerun. With `weight` (sampled rows), counts
+    and amounts are weighted estimates.
+    """
+    cols = list(keys) + ["origin_country", "destination_country"]
+    if weight:
+        df = df.assign(_w=df[weight], _wamount=df[value] * df[weight])
+        agg = df.groupby(cols, dropna=False, observed=True).agg(Count=("_w", "sum"), amount=("_wamount", "sum"))
+        agg["Count"] = agg["Count"].round().astype("int64")
+        agg = agg.reset_index()
+    else:
+        agg = (
+            df.groupby(cols, dropna=False, observed=True)
+            .agg(Count=(value, "size"), amount=(value, "sum"))
+            .reset_index()
+        )
+    return _with_iso3(agg)
+
+
+def corridor_table(counts: pd.DataFrame) -> pd.DataFrame:
+    """corridor_counts-shaped table from the counts kept at refresh time (refresh.update_aggregates)."""
+    return _with_iso3(counts.reset_index())
+
+
+def _with_iso3(agg: pd.DataFrame) -> pd.DataFrame:
+    agg["origin_iso3"] = to_iso3(agg["origin_country"])
+    agg["destination_iso3"] = to_iso3(agg["destination_country"])
+    return agg
+
+# -------------------------------------------
+# Figures
+# -------------------------------------------
+def corridor_map(corridors: pd.DataFrame, max_lines: int = 100) -> "go.Figure":
+    """Origin volume bubbles plus the top cross-border origin → destination flow lines."""
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    flows = (
+        corridors.groupby(
+            ["origin_country", "destination_country", "origin_iso3", "destination_iso3"], observed=True
+        )["Count"].sum().reset_index()
+    )
+    origins = (
+        flows.groupby(["origin_country", "origin_iso3"], observed=True)["Count"]
+        .sum().reset_index()
+    )
+
+    fig = px.scatter_geo(
+        origins,
+        locations="origin_iso3",
+        locationmode="ISO-3",
+        color="Count",
+        hover_name="origin_country",
+        size="Count",
+        title="Transaction Volume by Origin Country",
+        projection="natural earth",
+    )
+
+    cross = flows[flows["origin_iso3"] != flows["destination_iso3"]].nlargest(max_lines, "Count")
+    if not cross.empty:
+        peak = cross["Count"].max()
+        for row in cross.itertuples(index=False):
+            fig.add_trace(go.Scattergeo(
+                locations=[row.origin_iso3, row.destination_iso3],
+                locationmode="ISO-3",
+                mode="lines",
+                line=dict(width=0.5 + 3.5 * row.Count / peak, color="rgba(230, 57, 70, 0.45)"),
+                hoverinfo="text",
+                text=f"{row.origin_country} → {row.destination_country}: {row.Count:,}",
+                showlegend=False,
+            ))
+    fig.update_layout(**MAP_LAYOUT)
+    return fig
+
+
+def corridor_choropleth(corridors: pd.DataFrame, title: str = "🌎 Aggregated Transaction Corridors") -> "go.Figure":
+    """Total amount (base currency) by destination country."""
+    import plotly.express as px
+
+    agg = (
+        corridors.groupby(["destination_country", "destination_iso3"], observed=True)["amount"]
+        .sum().reset_index()
+    )
+    return px.choropleth(
+        agg,
+        locations="destination_iso3",
+        locationmode="ISO-3",
+        color="amount",
+        hover_name="destination_country",
+        title=title,
+        color_continuous_scale="Reds",
+    )
@@ -6,13 +6,19 @@
 # jurisdiction_risk, account_type, occupation, source_of_funds, pep_flag,
 # screening_result, device_count, join_date, kyc_status, risk_score,
 # onboarding_decision
+# screening_result comes from scripts/screening.py against
+# data/watchlist.csv (generated from these customers first if missing)
 # ============================================
 
+import os
 import pandas as pd
 import random
 from faker import Faker
 from datetime import date, timedelta
 
+from screening import WATCHLIST_PATH, apply_results, screen_customers
+from watchlist_gen import generate_watchlist
+
 fake = Faker()
 Faker.seed(42)
 random.seed(42)
@@ -91,10 +97,6 @@ for _ in range(1000):
 
     # Flags
     pep_flag = random.random() < 0.02
-    screening_result = (
-        "Confirmed Hit" if pep_flag else
-        random.choices(["Clear","Potential Match"], weights=[0.95,0.05])[0]
-    )
     device_count = random.choices([1,2,3,4,5], weights=[0.5,0.25,0.15,0.07,0.03])[0]
     join_date = random_join_date()
     kyc_status = random.choices(["Verified","Pending","Rejected"], weights=[0.9,0.05,0.05])[0]
@@ -113,12 +115,6 @@ for _ in range(1000):
         "High"
     )
 
-    onboarding_decision = (
-        "Rejected" if kyc_status == "Rejected" else
-        "Manual Review" if risk_score == "High" or screening_result != "Clear" else
-        "Approved"
-    )
-
     customers.append({
         "customer_id": fake.uuid4(),
         "name": name,
@@ -130,15 +126,24 @@ for _ in range(1000):
         "occupation": occupation,
         "source_of_funds": source_of_funds,
         "pep_flag": pep_flag,
-        "screening_result": screening_result,
+        "screening_result": None,
         "device_count": device_count,
         "join_date": join_date,
         "kyc_status": kyc_status,
         "risk_score": risk_score,
-        "onboarding_decision": onboarding_decision
+        "onboarding_decision": None
     })
 
 df = pd.DataFrame(customers)
+
+# --- Watchlist screening sets screening_result; onboarding_decision follows from it ---
+if not os.path.exists(WATCHLIST_PATH):
+    generate_watchlist(df).to_csv(WATCHLIST_PATH, index=False)
+    print(f"✅ Generated watchlist -> {WATCHLIST_PATH}")
+results = screen_customers(df, pd.read_csv(WATCHLIST_PATH), workers=1)
+df = apply_results(df, results)
+print(df["screening_result"].value_counts())
+
 # --- Keep only approved or manual review customers ---
 df = df[df["onboarding_decision"].isin(["Approved", "Manual Review"])]
 
@@ -0,0 +1,160 @@
+# ==========================================================
+# 📱 FinCrime Signals — devices.py
+# ----------------------------------------------------------
+# Device linkage (entity resolution on shared devices)
+# - Customers and devices are integer-coded; distinct
+#   (device, customer) pairs are kept sorted, never compared
+#   pairwise
+# - Every customer on a device is linked to that device's
+#   first customer; a vectorized union-find (hook + pointer
+#   jumping) turns the links into connected clusters
+# - Incremental: a batch only adds its new pairs and links
+# - Cluster size / cluster risk per customer feed the rules
+#   (rules.py) and case review
+# ==========================================================
+
+import numpy as np
+import pandas as pd
+
+RISK_ORDER = ["Low", "Medium", "High"]
+
+
+class DeviceLinks:
+    """Device→customers pairs plus union-find clusters over customers."""
+
+    def __init__(self):
+        self.customers = pd.Index([], dtype=object)
+        self.devices = pd.Index([], dtype=object)
+        self.pair_key = np.zeros(0, dtype=np.int64)       # sorted (device << 32) | customer
+        self.pair_device = np.zeros(0, dtype=np.int64)    # same order, split out for lookups
+        self.pair_customer = np.zeros(0, dtype=np.int64)
+        self.anchor = np.zeros(0, dtype=np.int64)         # first customer seen per device
+        self.parent = np.zeros(0, dtype=np.int64)         # union-find over customer codes
+        self._by_customer = None
+
+    # ---------------------------------------
+    # Building
+    # ---------------------------------------
+    @staticmethod
+    def _extend(index: pd.Index, values: pd.Series) -> pd.Index:
+        new = pd.Index(values.dropna().unique()).difference(index)
+        return index.append(new) if len(new) else index
+
+    def update(self, batch: pd.DataFrame) -> None:
+        """Add the (device_id, customer_id) pairs of `batch` and merge clusters."""
+        rows = batch[["device_id", "customer_id"]].dropna()
+        self.customers = self._extend(self.customers, rows["customer_id"])
+        self.devices = self._extend(self.devices, rows["device_id"])
+        self.parent = np.concatenate([self.parent, np.arange(len(self.parent), len(self.customers))])
+        self.anchor = np.concatenate([self.anchor, np.full(len(self.devices) - len(self.anchor), -1)])
+
+        dev = self.devices.get_indexer(rows["device_id"]).astype(np.int64)
+        cust = self.customers.get_indexer(rows["customer_id"]).astype(np.int64)
+        key = np.unique((dev << 32) | cust)
+        # Binary search into the sorted known pairs: cost follows the batch, not the history
+        pos = np.searchsorted(self.pair_key, key)
+        seen = pos < len(self.pair_key)
+        seen[seen] = self.pair_key[pos[seen]] == key[seen]
+        key, pos = key[~seen], pos[~seen]
+        if not len(key):
+            return
+        dev, cust = key >> 32, key & 0xFFFFFFFF
+
+        # New devices take their lowest-coded new customer as anchor
+        first = np.r_[True, dev[1:] != dev[:-1]]
+        unanchored = self.anchor[dev[first]] < 0
+        self.anchor[dev[first][unanchored]] = cust[first][unanchored]
+        self._union(self.anchor[dev], cust)
+
+        self.pair_key = np.insert(self.pair_key, pos, key)
+        self.pair_device = np.insert(self.pair_device, pos, dev)
+        self.pair_customer = np.insert(self.pair_customer, pos, cust)
+        self._by_customer = None
+
+    def _union(self, a: np.ndarray, b: np.ndarray) -> None:
+        """Hook larger roots onto smaller ones until every edge is inside one tree."""
+        parent = self.parent
+        while True:
+            ra, rb = parent[a], parent[b]
+            lo, hi = np.minimum(ra, rb), np.maximum(ra, rb)
+            todo = lo != hi
+            if not todo.any():
+                break
+            np.minimum.at(parent, hi[todo], lo[todo])
+            while True:  # pointer jumping: flatten every path to its root
+                grand = parent[parent]
+                if np.array_equal(grand, parent):
+                    break
+                parent = grand
+        self.parent = parent
+
+    # ---------------------------------------
+    # Lookups
+    # ---------------------------------------
+    def _customer_order(self) -> np.ndarray:
+        if self._by_customer is None:
+            self._by_customer = np.lexsort((self.pair_device, self.pair_customer))
+        return self._by_customer
+
+    def _code(self, customer_id: str) -> int:
+        return int(self.customers.get_indexer([customer_id])[0])
+
+    def device_customers(self, device_id: str) -> list:
+        dev = self.devices.get_indexer([device_id])[0]
+        if dev < 0:
+            return []
+        lo, hi = np.searchsorted(self.pair_device, [dev, dev + 1])
+        return self.customers[self.pair_customer[lo:hi]].tolist()
+
+    def customer_devices(self, customer_id: str) -> list:
+        code = self._code(customer_id)
+        if code < 0:
+            return []
+        order = self._customer_order()
+        lo, hi = np.searchsorted(self.pair_customer[order], [code, code + 1])
+        return self.devices[self.pair_device[order[lo:hi]]].tolist()
+
+    def linked_customers(self, customer_id: str) -> pd.DataFrame:
+        """Customers sharing at least one device with `customer_id`, with the shared device count."""
+        devices = self.devices.get_indexer(self.customer_devices(customer_id))
+        lo = np.searchsorted(self.pair_device, devices)
+        hi = np.searchsorted(self.pair_device, devices + 1)
+        codes = np.concatenate([self.pair_customer[l:h] for l, h in zip(lo, hi)] or [np.zeros(0, dtype=np.int64)])
+        codes = codes[codes != self._code(customer_id)]
+        linked, shared = np.unique(codes, return_counts=True)
+        return pd.DataFrame({"customer_id": self.customers[linked], "shared_devices": shared})
+
+    def cluster_members(self, customer_id: str) -> list:
+        code = self._code(customer_id)
+        if code < 0:
+            return [customer_id]
+        return self.customers[self.parent == self.parent[code]].tolist()
+
+    # ---------------------------------------
+    # Features
+    # ---------------------------------------
+    def features(self, risk_map: pd.Series = None) -> pd.DataFrame:
+        """
+        One row per customer: cluster_id, cluster_size, cluster_devices and,
+        with `risk_map` (customer_id -> Low/Medium/High), cluster_high_risk
+        (High-risk members) and cluster_risk (highest member risk).
+        """
+        root = self.parent
+        size = np.bincount(root, minlength=len(root))
+        devices_per_cluster = np.bincount(
+            root[self.anchor[self.anchor >= 0]], minlength=len(root)
+        )
+        out = pd.DataFrame({
+            "cluster_id": ("DC-" + pd.Series(root).astype(str).str.zfill(6)).to_numpy(),
+            "cluster_size": size[root],
+            "cluster_devices": devices_per_cluster[root],
+        }, index=pd.Index(self.customers, name="customer_id"))
+
+        if risk_map is not None:
+            risk = pd.Categorical(self.customers.map(risk_map), categories=RISK_ORDER, ordered=True).codes
+            high = np.bincount(root, weights=(risk == RISK_ORDER.index("High")), minlength=len(root))
+            top = np.full(len(root), -1)
+            np.maximum.at(top, root, risk)
+            out["cluster_high_risk"] = high[root].astype(np.int64)
+            out["cluster_risk"] = pd.Categorical.from_codes(top[root], categories=RISK_ORDER, ordered=True)
+        return out
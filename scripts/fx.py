@@ -0,0 +1,84 @@
+# ==========================================================
+# 💱 FinCrime Signals — fx.py
+# ----------------------------------------------------------
+# FX normalization stage: every transaction gets `amount_base`
+# in BASE_CURRENCY using the local rate table (fx_rates.csv)
+# - Rates sorted once by (currency, day) into flat arrays
+# - As-of lookup (latest rate on or before the transaction
+#   day) with a single np.searchsorted — no per-row Python
+# ==========================================================
+
+import os
+
+import numpy as np
+import pandas as pd
+
+BASE_CURRENCY = "EUR"
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FX_PATH = os.path.join(BASE_DIR, "data", "fx_rates.csv")
+
+# (currency code, day number) packed into one sortable int64 key
+_DAY_BITS = 32
+
+
+class RateTable:
+    """Rate table flattened into sorted (currency, day) keys for as-of lookups."""
+
+    def __init__(self, rates: pd.DataFrame):
+        rates = rates.dropna(subset=["date", "currency", "rate_to_base"])
+        rates = rates[rates["currency"] != BASE_CURRENCY]
+        self.currencies = sorted(rates["currency"].unique().tolist())
+        codes = pd.Categorical(rates["currency"], categories=self.currencies).codes.astype(np.int64)
+        days = pd.to_datetime(rates["date"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+        order = np.lexsort((days, codes))
+        self.codes = codes[order]
+        self.keys = (self.codes << _DAY_BITS) + days[order]
+        self.rates = rates["rate_to_base"].to_numpy(dtype=np.float64)[order]
+        # First row per currency: used for days before the table starts
+        self.first = np.searchsorted(self.codes, np.arange(len(self.currencies)), side="left")
+
+    def to_base(self, amount, currency, timestamp) -> np.ndarray:
+        """
+        Convert `amount` in `currency` at `timestamp` to BASE_CURRENCY.
+        Base-currency rows pass through. Currencies missing from the table
+        raise ValueError (refresh.read_transactions quarantines them first).
+        """
+        amount = np.asarray(amount, dtype=np.float64)
+        ts = np.asarray(timestamp)
+        if ts.dtype.kind != "M":
+            ts = pd.to_datetime(ts).to_numpy()
+        days = ts.astype("datetime64[D]").astype(np.int64)
+
+        # Base currency gets its own code after the table currencies
+        base_code = len(self.currencies)
+        codes = pd.Categorical(currency, categories=self.currencies + [BASE_CURRENCY]).codes.astype(np.int64)
+        if (codes < 0).any():
+            unknown = sorted(pd.unique(np.asarray(currency, dtype=object)[codes < 0]).astype(str))
+            raise ValueError(f"No FX rate to {BASE_CURRENCY} for currencies: {', '.join(unknown)} (see {FX_PATH})")
+        known = codes != base_code
+        safe_codes = np.where(known, codes, 0)
+
+        pos = np.searchsorted(self.keys, (safe_codes << _DAY_BITS) + days, side="right") - 1
+        # Before the first rate for this currency (or spilled into the previous
+        # currency's block): fall back to the earliest rate we have
+        stale = (pos < 0) | (self.codes[np.clip(pos, 0, None)] != safe_codes)
+        pos = np.where(stale, self.first[safe_codes], pos)
+
+        rate = np.where(known, self.rates[np.clip(pos, 0, len(self.rates) - 1)], np.nan)
+        rate = np.where(codes == base_code, 1.0, rate)
+        return np.round(amount * rate, 2)
+
+
+def load_rates(path: str = FX_PATH) -> RateTable:
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"fx_rates.csv not found at: {path} (run scripts/fx_rates_gen.py)")
+    return RateTable(pd.read_csv(path))
+
+
+def add_amount_base(tx: pd.DataFrame, table: RateTable = None) -> pd.DataFrame:
+    """Add the `amount_base` column in place and return the frame."""
+    table = table or load_rates()
+    tx["amount_base"] = table.to_base(tx["amount"].to_numpy(), tx["currency"].to_numpy(), tx["timestamp"].to_numpy())
+    return tx
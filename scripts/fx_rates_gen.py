@@ -0,0 +1,52 @@
+# ==========================================================
+# 💱 FinCrime Signals — fx_rates_gen.py
+# ----------------------------------------------------------
+# Generates a synthetic local FX rate table (data/fx_rates.csv)
+# - Business-day rates for every non-base currency in
+#   transactions_gen.py::CURRENCIES
+# - rate_to_base: multiply an amount in `currency` by this
+#   to get the base currency (EUR)
+# - Geometric random walk around a realistic anchor rate
+# - Reproducible with a fixed seed
+# ==========================================================
+
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from fx import BASE_CURRENCY
+
+SEED = 42
+
+# Anchor rates (1 unit of currency -> EUR) and daily volatility
+ANCHORS = {"USD": 0.92, "GBP": 1.17}
+DAILY_VOL = 0.004
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+OUT_PATH = os.path.join(BASE_DIR, "data", "fx_rates.csv")
+
+
+def generate_rates(start: date, end: date) -> pd.DataFrame:
+    rng = np.random.default_rng(SEED)
+    days = pd.bdate_range(start, end)  # weekends left out on purpose: lookups are as-of
+    frames = []
+    for currency, anchor in ANCHORS.items():
+        walk = np.exp(np.cumsum(rng.normal(0, DAILY_VOL, len(days))))
+        frames.append(pd.DataFrame({
+            "date": days.date,
+            "currency": currency,
+            "rate_to_base": np.round(anchor * walk, 6),
+        }))
+    return pd.concat(frames, ignore_index=True).sort_values(["currency", "date"])
+
+
+if __name__ == "__main__":
+    end = date.today()
+    start = end - timedelta(days=2 * 365)
+    rates = generate_rates(start, end)
+    os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
+    rates.to_csv(OUT_PATH, index=False)
+    print(f"✅ Saved {len(rates):,} FX rates ({start} → {end}, base {BASE_CURRENCY}) -> {OUT_PATH}")
+    print(rates.groupby("currency")["rate_to_base"].describe()[["min", "mean", "max"]].to_string())
@@ -0,0 +1,58 @@
+# ==========================================================
+# 🌍 FinCrime Signals — geo.py
+# ----------------------------------------------------------
+# Precomputed country name -> ISO-3166 alpha-3 lookup for
+# every jurisdiction in customers_gen.py::jurisdiction_map,
+# so maps can use locationmode="ISO-3" instead of resolving
+# country names on every render.
+# ==========================================================
+
+import pandas as pd
+
+COUNTRY_ISO3 = {
+    # --- Low ---
+    "Andorra": "AND", "Austria": "AUT", "Belgium": "BEL", "Bosnia and Herzegovina": "BIH",
+    "Bulgaria": "BGR", "Czech Republic": "CZE", "Denmark": "DNK", "Estonia": "EST",
+    "Finland": "FIN", "France": "FRA", "Greece": "GRC", "Iceland": "ISL", "Ireland": "IRL",
+    "Kosovo": "XKX", "Latvia": "LVA", "Liechtenstein": "LIE", "Lithuania": "LTU",
+    "Luxembourg": "LUX", "Monaco": "MCO", "Montenegro": "MNE", "North Macedonia": "MKD",
+    "Norway": "NOR", "Poland": "POL", "Portugal": "PRT", "San Marino": "SMR", "Slovakia": "SVK",
+    "Slovenia": "SVN", "Spain": "ESP", "Sweden": "SWE", "Switzerland": "CHE",
+    "Vatican City": "VAT", "United Kingdom": "GBR", "Gibraltar": "GIB", "Guernsey": "GGY",
+    "Jersey": "JEY", "Isle of Man": "IMN", "Canada": "CAN", "Chile": "CHL", "Uruguay": "URY",
+    "Armenia": "ARM", "Brunei": "BRN", "Israel": "ISR", "South Korea": "KOR", "Taiwan": "TWN",
+    "Australia": "AUS", "Norfolk Island": "NFK", "New Zealand": "NZL", "Cook Islands": "COK",
+    "Niue": "NIU", "New Caledonia": "NCL", "French Polynesia": "PYF", "Bermuda": "BMU",
+    "Cayman Islands": "CYM", "British Virgin Islands": "VGB", "Puerto Rico": "PRI",
+    "Guam": "GUM", "American Samoa": "ASM", "Northern Mariana Islands": "MNP",
+    # --- Medium ---
+    "Croatia": "HRV", "Cyprus": "CYP", "Germany": "DEU", "Hungary": "HUN", "Italy": "ITA",
+    "Malta": "MLT", "Moldova": "MDA", "Romania": "ROU", "Serbia": "SRB", "Ukraine": "UKR",
+    "Netherlands": "NLD", "Aruba": "ABW", "Curaçao": "CUW", "Sint Maarten": "SXM",
+    "United States": "USA", "Mexico": "MEX", "Argentina": "ARG", "Brazil": "BRA",
+    "Colombia": "COL", "Peru": "PER", "Paraguay": "PRY", "Ecuador": "ECU", "Bolivia": "BOL",
+    "Panama": "PAN", "Costa Rica": "CRI", "Guatemala": "GTM", "Honduras": "HND",
+    "Dominican Republic": "DOM", "Jamaica": "JAM", "Bahamas": "BHS", "Barbados": "BRB",
+    "Guyana": "GUY", "Botswana": "BWA", "Egypt": "EGY", "Ethiopia": "ETH", "Ghana": "GHA",
+    "Lesotho": "LSO", "Malawi": "MWI", "Mauritius": "MUS", "Morocco": "MAR", "Namibia": "NAM",
+    "Rwanda": "RWA", "Senegal": "SEN", "Seychelles": "SYC", "South Africa": "ZAF",
+    "Tunisia": "TUN", "Uganda": "UGA", "Zambia": "ZMB", "Zimbabwe": "ZWE", "Azerbaijan": "AZE",
+    "Bahrain": "BHR", "Bangladesh": "BGD", "Georgia": "GEO", "India": "IND", "Indonesia": "IDN",
+    "Japan": "JPN", "Jordan": "JOR", "Kazakhstan": "KAZ", "Kyrgyzstan": "KGZ", "Lebanon": "LBN",
+    "Malaysia": "MYS", "Maldives": "MDV", "Mongolia": "MNG", "Oman": "OMN", "Pakistan": "PAK",
+    "Philippines": "PHL", "Qatar": "QAT", "Saudi Arabia": "SAU", "Singapore": "SGP",
+    "Sri Lanka": "LKA", "Turkey": "TUR", "United Arab Emirates": "ARE", "Uzbekistan": "UZB",
+    "Hong Kong SAR": "HKG", "Macau SAR": "MAC", "Fiji": "FJI", "Samoa": "WSM", "Tonga": "TON",
+    "Vanuatu": "VUT", "Papua New Guinea": "PNG", "Palau": "PLW", "Micronesia": "FSM",
+    "Marshall Islands": "MHL", "Timor-Leste": "TLS",
+    # --- High ---
+    "Algeria": "DZA", "Cameroon": "CMR", "Côte d’Ivoire": "CIV", "Kenya": "KEN",
+    "Madagascar": "MDG", "Mozambique": "MOZ", "Nigeria": "NGA", "Tanzania": "TZA",
+    "Cambodia": "KHM", "China": "CHN", "Kuwait": "KWT", "Laos": "LAO", "Nepal": "NPL",
+    "Tajikistan": "TJK", "Vietnam": "VNM", "Solomon Islands": "SLB",
+}
+
+
+def to_iso3(countries: pd.Series) -> pd.Series:
+    """Vectorized name -> ISO-3 lookup; unknown names come back as NaN."""
+    return countries.map(COUNTRY_ISO3)
@@ -0,0 +1,99 @@
+# ==========================================================
+# 🗂️ FinCrime Signals — metadata.py
+# ----------------------------------------------------------
+# Dataset metadata artifact for the dashboards
+# - Filter option lists, normalized alert labels, row counts
+#   and date ranges, folded in from each refresh batch
+#   (refresh.py) so it never rescans the full dataset
+# - Stored as data/cache/metadata.json; reading it needs only
+#   json, so pages draw their filters without touching the
+#   transactions frame
+# ==========================================================
+
+import os
+import json
+
+# -------------------------------
+# Paths (robust to working dir)
+# -------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METADATA_PATH = os.path.join(BASE_DIR, "data", "cache", "metadata.json")
+
+# Display label for transactions without an alert (alert_type == "")
+UNFLAGGED = "Unflagged"
+
+OPTION_COLUMNS = ["risk_score", "alert_type", "origin_country"]
+CASE_OPTION_COLUMNS = ["alert_type", "risk_score", "jurisdiction_risk"]
+
+
+def alert_label(alert_type: str) -> str:
+    return alert_type or UNFLAGGED
+
+
+def alert_value(label: str) -> str:
+    """Inverse of alert_label: the alert_type stored in the data for a filter label."""
+    return "" if label == UNFLAGGED else label
+
+
+def empty_metadata() -> dict:
+    return {
+        "rows": 0,
+        "flagged_rows": 0,
+        "customers": 0,
+        "date_min": None,
+        "date_max": None,
+        "alert_counts": {},
+        # All transactions (Transactions dashboard); alert types as labels
+        "options": {col: [] for col in OPTION_COLUMNS},
+        # Flagged transactions only (Case Review)
+        "case_options": {col: [] for col in CASE_OPTION_COLUMNS},
+    }
+
+
+def _merge_options(current: list, values) -> list:
+    return sorted(set(current).union(v for v in values if isinstance(v, str)))
+
+
+def update_metadata(meta: dict, batch, n_customers: int) -> dict:
+    """
+    Fold one batch into `meta`. `batch` is a transactions frame with the
+    customer's risk_score / jurisdiction_risk joined on; `n_customers` is the
+    distinct customer count after the batch.
+    """
+    if batch.empty:
+        return meta
+    labels = batch["alert_type"].replace("", UNFLAGGED)
+    flagged = batch[batch["is_flagged"]]
+
+    meta["rows"] += len(batch)
+    meta["flagged_rows"] += len(flagged)
+    meta["customers"] = int(n_customers)
+
+    lo = batch["timestamp"].min().isoformat(timespec="seconds")
+    hi = batch["timestamp"].max().isoformat(timespec="seconds")
+    meta["date_min"] = min(filter(None, [meta["date_min"], lo]))
+    meta["date_max"] = max(filter(None, [meta["date_max"], hi]))
+
+    for label, count in labels.value_counts().items():
+        meta["alert_counts"][label] = meta["alert_counts"].get(label, 0) + int(count)
+
+    keyed = batch.assign(alert_type=labels)
+    for col in OPTION_COLUMNS:
+        meta["options"][col] = _merge_options(meta["options"][col], keyed[col].unique())
+    for col in CASE_OPTION_COLUMNS:
+        meta["case_options"][col] = _merge_options(meta["case_options"][col], flagged[col].unique())
+    return meta
+
+
+def save_metadata(meta: dict, path: str) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_metadata(path: str = METADATA_PATH) -> dict | None:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
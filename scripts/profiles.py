@@ -0,0 +1,350 @@
+# ==========================================================
+# 📈 FinCrime Signals — profiles.py
+# ----------------------------------------------------------
+# Customer behavioral baselines and deviation scoring
+# - Weekly per-customer buckets (count / sum / sum of squares
+#   of amount_base, channel bitmask, destinations) over a
+#   rolling window, appended from each batch in one grouped
+#   pass; expired weeks are pruned
+# - Profiles (amount mean/std, typical channels, known
+#   corridors, tx rate) kept as flat arrays indexed by
+#   customer code: O(1) per-event lookup
+# - Deviation score per transaction against the baseline as
+#   of the start of its batch: amount z-score plus new-corridor
+#   / new-channel flags, fully vectorized
+# ==========================================================
+
+import numpy as np
+import pandas as pd
+
+PROFILE_WINDOW_WEEKS = 13      # ~90 days of history per baseline
+MIN_HISTORY = 5                # transactions before a baseline is trusted
+STD_FLOOR = 1.0                # base-currency units; avoids huge z on flat histories
+Z_CAP = 10.0
+NEW_CORRIDOR_WEIGHT = 2.0
+NEW_CHANNEL_WEIGHT = 1.0
+MAX_CHANNELS = 63              # channel set stored as an int64 bitmask
+
+SCORE_COLUMNS = ["amount_z", "new_corridor", "new_channel", "deviation_score"]
+
+_WEEK = "7D"
+_DEST_BITS = 20
+_WEEK_BITS = 16
+
+
+def _score_frame(index: pd.Index, z: np.ndarray, new_corridor: np.ndarray, new_channel: np.ndarray) -> pd.DataFrame:
+    out = pd.DataFrame({
+        "amount_z": np.round(z, 3),
+        "new_corridor": new_corridor,
+        "new_channel": new_channel,
+    }, index=index)
+    out["deviation_score"] = np.round(
+        np.minimum(np.abs(z), Z_CAP) + NEW_CORRIDOR_WEIGHT * new_corridor + NEW_CHANNEL_WEIGHT * new_channel, 3
+    )
+    return out
+
+
+class BaselineProfiles:
+    """Rolling per-customer baselines, updated batch by batch."""
+
+    def __init__(self, window_weeks: int = PROFILE_WINDOW_WEEKS):
+        self.window_weeks = window_weeks
+        self.customers = pd.Index([], dtype=object)
+        self.channels = pd.Index([], dtype=object)
+        self.countries = pd.Index([], dtype=object)
+        self.last_week = None
+
+        # Append-only weekly buckets (one row per customer/week per batch)
+        self.amount_buckets = pd.DataFrame({
+            "cust": pd.Series(dtype="int64"), "week": pd.Series(dtype="int64"),
+            "n": pd.Series(dtype="int64"), "s": pd.Series(dtype="float64"), "s2": pd.Series(dtype="float64"),
+            "channels": pd.Series(dtype="int64"),
+        })
+        self.dest_buckets = pd.DataFrame({
+            "cust": pd.Series(dtype="int64"), "week": pd.Series(dtype="int64"), "dest": pd.Series(dtype="int64"),
+        })
+
+        # Profile arrays, position = customer code
+        self.n = np.zeros(0, dtype=np.int64)
+        self.mean = np.zeros(0)
+        self.std = np.zeros(0)
+        self.tx_per_week = np.zeros(0)
+        self.channel_mask = np.zeros(0, dtype=np.int64)
+        # Known corridors: sorted (customer << _DEST_BITS | destination) keys
+        self.corridors = np.zeros(0, dtype=np.int64)
+        self.corridor_lo = np.zeros(0, dtype=np.int64)
+        self.corridor_hi = np.zeros(0, dtype=np.int64)
+
+    # ---------------------------------------
+    # Coding helpers
+    # ---------------------------------------
+    @staticmethod
+    def _extend(index: pd.Index, values: pd.Series) -> pd.Index:
+        new = pd.Index(values.dropna().unique()).difference(index)
+        return index.append(new) if len(new) else index
+
+    @staticmethod
+    def _weeks(timestamps: pd.Series) -> np.ndarray:
+        return pd.to_datetime(timestamps).dt.floor(_WEEK).to_numpy().astype("datetime64[ns]").astype(np.int64)
+
+    def _grow(self) -> None:
+        extra = len(self.customers) - len(self.n)
+        if extra:
+            self.n = np.concatenate([self.n, np.zeros(extra, dtype=np.int64)])
+            self.mean = np.concatenate([self.mean, np.zeros(extra)])
+            self.std = np.concatenate([self.std, np.zeros(extra)])
+            self.tx_per_week = np.concatenate([self.tx_per_week, np.zeros(extra)])
+            self.channel_mask = np.concatenate([self.channel_mask, np.zeros(extra, dtype=np.int64)])
+            self.corridor_lo = np.concatenate([self.corridor_lo, np.zeros(extra, dtype=np.int64)])
+            self.corridor_hi = np.concatenate([self.corridor_hi, np.zeros(extra, dtype=np.int64)])
+
+    # ---------------------------------------
+    # Update
+    # ---------------------------------------
+    def update(self, batch: pd.DataFrame) -> None:
+        """Fold `batch` into the weekly buckets, prune expired weeks, refresh touched profiles."""
+        if batch.empty:
+            return
+        cust, week = self._encode(batch)
+        self._fold(*self._buckets(batch, cust, week), cust, int(week.max()))
+
+    def _encode(self, batch: pd.DataFrame) -> tuple:
+        """Extend the code indexes with `batch`; returns its (customer code, week) arrays."""
+        self.customers = self._extend(self.customers, batch["customer_id"])
+        self.channels = self._extend(self.channels, batch["channel"])
+        self.countries = self._extend(self.countries, batch["destination_country"])
+        self._grow()
+        return self.customers.get_indexer(batch["customer_id"]).astype(np.int64), self._weeks(batch["timestamp"])
+
+    def _buckets(self, batch: pd.DataFrame, cust: np.ndarray, week: np.ndarray) -> tuple:
+        """(amount buckets, destination buckets) of `batch`, one grouped pass over (customer, week)."""
+        amount = batch["amount_base"].to_numpy(dtype=np.float64)
+        channel = self.channels.get_indexer(batch["channel"]).astype(np.int64)
+        channel_bit = np.where((channel >= 0) & (channel < MAX_CHANNELS), np.left_shift(1, np.clip(channel, 0, 62)), 0)
+
+        # Dense group ids, then bincount / OR-reduce
+        gid = pd.DataFrame({"cust": cust, "week": week}).groupby(["cust", "week"], sort=False).ngroup().to_numpy()
+        _, first = np.unique(gid, return_index=True)
+        channels = np.zeros(len(first), dtype=np.int64)
+        np.bitwise_or.at(channels, gid, channel_bit)
+        new_amounts = pd.DataFrame({
+            "cust": cust[first],
+            "week": week[first],
+            "n": np.bincount(gid).astype(np.int64),
+            "s": np.bincount(gid, weights=amount),
+            "s2": np.bincount(gid, weights=amount * amount),
+            "channels": channels,
+        })
+        new_dests = pd.DataFrame({
+            "cust": cust, "week": week,
+            "dest": self.countries.get_indexer(batch["destination_country"]).astype(np.int64),
+        }).drop_duplicates()
+        return new_amounts, new_dests
+
+    def _fold(self, new_amounts: pd.DataFrame, new_dests: pd.DataFrame, cust: np.ndarray, last_week: int) -> None:
+        self.amount_buckets = pd.concat([self.amount_buckets, new_amounts], ignore_index=True)
+        self.dest_buckets = pd.concat([self.dest_buckets, new_dests], ignore_index=True)
+
+        # Rolling window: drop weeks older than the window, their customers need a refresh too
+        self.last_week = max(last_week, self.last_week or last_week)
+        cutoff = self.last_week - (self.window_weeks - 1) * pd.Timedelta(_WEEK).value
+        expired = self.amount_buckets["week"].to_numpy() < cutoff
+        touched = np.zeros(len(self.customers), dtype=bool)
+        touched[cust] = True
+        touched[self.amount_buckets["cust"].to_numpy()[expired]] = True
+        if expired.any():
+            self.amount_buckets = self.amount_buckets[~expired].reset_index(drop=True)
+            self.dest_buckets = self.dest_buckets[self.dest_buckets["week"] >= cutoff].reset_index(drop=True)
+
+        self._refresh_profiles(touched)
+
+    def _refresh_profiles(self, touched: np.ndarray) -> None:
+        b = self.amount_buckets
+        rows = touched[b["cust"].to_numpy()]
+        cust = b["cust"].to_numpy()[rows]
+        size = len(self.customers)
+
+        n = np.bincount(cust, weights=b["n"].to_numpy()[rows], minlength=size)
+        s = np.bincount(cust, weights=b["s"].to_numpy()[rows], minlength=size)
+        s2 = np.bincount(cust, weights=b["s2"].to_numpy()[rows], minlength=size)
+        mask = np.zeros(size, dtype=np.int64)
+        np.bitwise_or.at(mask, cust, b["channels"].to_numpy()[rows])
+        first = np.full(size, self.last_week, dtype=np.int64)
+        np.minimum.at(first, cust, b["week"].to_numpy()[rows])
+
+        idx = np.flatnonzero(touched)
+        n, s, s2 = n[idx], s[idx], s2[idx]
+        safe_n = np.maximum(n, 1)
+        var = np.where(n > 1, (s2 - s * s / safe_n) / np.maximum(n - 1, 1), 0.0)
+        weeks = (self.last_week - first[idx]) // pd.Timedelta(_WEEK).value + 1
+
+        self.n[idx] = n.astype(np.int64)
+        self.mean[idx] = np.where(n > 0, s / safe_n, 0.0)
+        self.std[idx] = np.sqrt(np.clip(var, 0, None))
+        self.tx_per_week[idx] = n / weeks
+        self.channel_mask[idx] = mask[idx]
+
+        # Known corridors: replace the touched customers' keys, keep everyone else's
+        d = self.dest_buckets
+        rows = touched[d["cust"].to_numpy()]
+        fresh = np.unique((d["cust"].to_numpy()[rows] << _DEST_BITS) | d["dest"].to_numpy()[rows])
+        kept = self.corridors[~touched[self.corridors >> _DEST_BITS]]
+        self.corridors = np.insert(kept, np.searchsorted(kept, fresh), fresh)
+        counts = np.bincount(self.corridors >> _DEST_BITS, minlength=size)
+        self.corridor_hi = np.cumsum(counts)
+        self.corridor_lo = self.corridor_hi - counts
+
+    # ---------------------------------------
+    # Scoring
+    # ---------------------------------------
+    def score(self, batch: pd.DataFrame) -> pd.DataFrame:
+        """Deviation features for `batch` against the current baselines (aligned with batch.index)."""
+        cust = self.customers.get_indexer(batch["customer_id"]).astype(np.int64)
+        known = cust >= 0
+        safe = np.where(known, cust, 0)
+        history = known & (self.n[safe] >= MIN_HISTORY) if len(self.n) else np.zeros(len(batch), dtype=bool)
+
+        amount = batch["amount_base"].to_numpy(dtype=np.float64)
+        z = np.zeros(len(batch))
+        if history.any():
+            z = np.where(history, (amount - self.mean[safe]) / np.maximum(self.std[safe], STD_FLOOR), 0.0)
+
+        channel = self.channels.get_indexer(batch["channel"]).astype(np.int64)
+        has_bit = np.zeros(len(batch), dtype=bool)
+        ok = history & (channel >= 0) & (channel < MAX_CHANNELS)
+        has_bit[ok] = (self.channel_mask[safe[ok]] >> channel[ok]) & 1 == 1
+        new_channel = history & ~has_bit
+
+        dest = self.countries.get_indexer(batch["destination_country"]).astype(np.int64)
+        keys = (safe << _DEST_BITS) | np.clip(dest, 0, None)
+        pos = np.clip(np.searchsorted(self.corridors, keys), 0, max(len(self.corridors) - 1, 0))
+        seen = (dest >= 0) & (self.corridors[pos] == keys) if len(self.corridors) else np.zeros(len(batch), dtype=bool)
+        new_corridor = history & ~seen
+        return _score_frame(batch.index, z, new_corridor, new_channel)
+
+    def replay(self, tx: pd.DataFrame) -> pd.DataFrame:
+        """
+        Score a full history as if fed week by week (each week against the
+        baselines of the window before it), then fold it in. The windows come
+        from one grouped pass: cumulative bucket sums per customer, read
+        at each week's window bounds.
+        """
+        if tx.empty:
+            return pd.DataFrame(columns=SCORE_COLUMNS)
+        cust, week = self._encode(tx)
+        new_amounts, new_dests = self._buckets(tx, cust, week)
+        week_ns = pd.Timedelta(_WEEK).value
+
+        # Window per row: buckets in [prev - (window - 1), prev], prev = latest week before the row's
+        tx_weeks = np.unique(week)
+        prev = np.r_[self.last_week if self.last_week is not None else -1, tx_weeks[:-1]]
+        if self.last_week is not None:
+            prev = np.maximum(prev, self.last_week)
+        row_prev = prev[np.searchsorted(tx_weeks, week)]
+        has_prev = row_prev >= 0
+        hi_week = np.where(has_prev, row_prev // week_ns + 1, 0)
+        lo_week = np.where(has_prev, row_prev // week_ns - (self.window_weeks - 1), 0)
+
+        # Amount buckets sorted by (customer, week): windowed sums are cumsum differences
+        b = pd.concat([self.amount_buckets, new_amounts], ignore_index=True)
+        keys = (b["cust"].to_numpy() << 32) | (b["week"].to_numpy() // week_ns)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        lo = np.searchsorted(keys, (cust << 32) | lo_week)
+        hi = np.searchsorted(keys, (cust << 32) | hi_week)
+
+        def windowed(values):
+            total = np.r_[0, np.cumsum(values[order])]
+            return total[hi] - total[lo]
+
+        n = windowed(b["n"].to_numpy())
+        s = windowed(b["s"].to_numpy())
+        s2 = windowed(b["s2"].to_numpy())
+        history = n >= MIN_HISTORY
+        safe_n = np.maximum(n, 1)
+        mean = s / safe_n
+        std = np.sqrt(np.clip(np.where(n > 1, (s2 - s * s / safe_n) / np.maximum(n - 1, 1), 0.0), 0, None))
+        amount = tx["amount_base"].to_numpy(dtype=np.float64)
+        z = np.where(history, (amount - mean) / np.maximum(std, STD_FLOOR), 0.0)
+
+        # Channel seen in the window: windowed count of buckets carrying the row's channel bit
+        channel = self.channels.get_indexer(tx["channel"]).astype(np.int64)
+        bucket_channels = b["channels"].to_numpy()
+        has_bit = np.zeros(len(tx), dtype=bool)
+        for code in np.unique(channel[(channel >= 0) & (channel < MAX_CHANNELS)]):
+            rows = channel == code
+            total = np.r_[0, np.cumsum((bucket_channels[order] >> code) & 1)]
+            has_bit[rows] = total[hi[rows]] > total[lo[rows]]
+        new_channel = history & ~has_bit
+
+        # Corridor seen in the window: latest (customer, destination) bucket before the row's week
+        # (weeks counted from the earliest bucket so customer, destination and week fit one int64)
+        d = pd.concat([self.dest_buckets, new_dests], ignore_index=True)
+        base = int(d["week"].min() // week_ns)
+        pair = (d["cust"].to_numpy() << _DEST_BITS) | d["dest"].to_numpy()
+        dkeys = np.sort((pair << _WEEK_BITS) | (d["week"].to_numpy() // week_ns - base))
+        dest = self.countries.get_indexer(tx["destination_country"]).astype(np.int64)
+        row_pair = (cust << _DEST_BITS) | np.clip(dest, 0, None)
+        pos = np.searchsorted(dkeys, (row_pair << _WEEK_BITS) | np.clip(hi_week - base, 0, None)) - 1
+        found = dkeys[np.clip(pos, 0, None)]
+        seen = (
+            (dest >= 0) & (pos >= 0) & (found >> _WEEK_BITS == row_pair)
+            & ((found & ((1 << _WEEK_BITS) - 1)) >= lo_week - base)
+        )
+        new_corridor = history & ~seen
+
+        self._fold(new_amounts, new_dests, cust, int(week.max()))
+        return _score_frame(tx.index, z, new_corridor, new_channel)
+
+    # ---------------------------------------
+    # Lookups
+    # ---------------------------------------
+    def profile(self, customer_id: str) -> dict | None:
+        """Baseline for one customer (hash lookup + array reads)."""
+        code = self.customers.get_indexer([customer_id])[0]
+        if code < 0:
+            return None
+        mask = int(self.channel_mask[code])
+        dests = self.corridors[self.corridor_lo[code]:self.corridor_hi[code]] & ((1 << _DEST_BITS) - 1)
+        return {
+            "tx_count": int(self.n[code]),
+            "amount_mean": float(self.mean[code]),
+            "amount_std": float(self.std[code]),
+            "tx_per_week": float(self.tx_per_week[code]),
+            "channels": [c for i, c in enumerate(self.channels[:MAX_CHANNELS]) if mask >> i & 1],
+            "destinations": self.countries[dests].tolist(),
+        }
+
+    def score_event(self, customer_id: str, amount_base: float, channel: str, destination_country: str) -> dict:
+        """Deviation features for a single incoming event (hash lookups only), same rules as score()."""
+        if customer_id not in self.customers:
+            return {"amount_z": 0.0, "new_corridor": False, "new_channel": False, "deviation_score": 0.0}
+        code = self.customers.get_loc(customer_id)
+        if self.n[code] < MIN_HISTORY:
+            return {"amount_z": 0.0, "new_corridor": False, "new_channel": False, "deviation_score": 0.0}
+
+        z = (amount_base - self.mean[code]) / max(self.std[code], STD_FLOOR)
+        ch = self.channels.get_loc(channel) if channel in self.channels else -1
+        new_channel = not (0 <= ch < MAX_CHANNELS and (int(self.channel_mask[code]) >> ch) & 1)
+        dest = self.countries.get_loc(destination_country) if destination_country in self.countries else -1
+        known = self.corridors[self.corridor_lo[code]:self.corridor_hi[code]]
+        new_corridor = dest < 0 or not bool(np.any(known == ((code << _DEST_BITS) | dest)))
+        return {
+            "amount_z": round(float(z), 3),
+            "new_corridor": new_corridor,
+            "new_channel": new_channel,
+            "deviation_score": round(
+                min(abs(float(z)), Z_CAP) + NEW_CORRIDOR_WEIGHT * new_corridor + NEW_CHANNEL_WEIGHT * new_channel, 3
+            ),
+        }
+
+    def table(self) -> pd.DataFrame:
+        """Compact keyed profile table (one row per customer)."""
+        return pd.DataFrame({
+            "tx_count": self.n,
+            "amount_mean": self.mean.round(2),
+            "amount_std": self.std.round(2),
+            "tx_per_week": self.tx_per_week.round(3),
+            "channel_mask": self.channel_mask,
+            "corridors": self.corridor_hi - self.corridor_lo,
+        }, index=pd.Index(self.customers, name="customer_id"))
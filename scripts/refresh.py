@@ -0,0 +1,491 @@
+# ==========================================================
+# 🔄 FinCrime Signals — refresh.py
+# ----------------------------------------------------------
+# Incremental data refresh for the dashboards
+# - data/transactions.csv is parsed once into a typed base part
+# - New transactions arrive as delta CSVs in data/deltas/
+#   (same columns as transactions.csv, any file name; applied
+#   in file-name order)
+# - A row is new when its transaction_id has not been
+#   ingested (hashed ids are kept per part); timestamps only
+#   order rows. Unseen rows older than the watermark are late
+#   and quarantined; seen ids are skipped
+# - Each delta updates the derived state from its own rows:
+#   typed part, per-customer row index (kept per part, so
+#   no file grows with total rows), aggregates, rule state,
+#   device linkage clusters, dataset metadata (metadata.py),
+#   behavioral baselines (profiles.py; rows are scored against
+#   the baseline before it absorbs them)
+# - Every file is validated on the way in (validation.py):
+#   bad rows are quarantined and counted in the manifest
+# - The base is rebuilt when transactions.csv or customers.csv
+#   changes (customer keys and attributes feed the checks and
+#   the derived state)
+# - manifest.json (version + watermark) is swapped atomically
+#   and names the state / aggregates generation it belongs to;
+#   TransactionCache readers load only the parts they lack
+# - Writers (dashboards, CLI tools) take a file lock on the
+#   cache directory, so one refresh runs at a time
+# ==========================================================
+
+import os
+import glob
+import json
+import pickle
+import hashlib
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: refreshes are only serialised within a process
+    fcntl = None
+
+from devices import DeviceLinks
+from fx import BASE_CURRENCY, add_amount_base, load_rates
+from metadata import empty_metadata, update_metadata, save_metadata
+from profiles import SCORE_COLUMNS, BaselineProfiles
+from rules import RuleState, evaluate_rules
+from sampling import StratifiedSample, CellSketches
+from validation import CUSTOMER_SCHEMA, QUARANTINE_DIR, TX_SCHEMA, format_report, quarantine_rows, read_validated
+
+# -------------------------------
+# Paths (robust to working dir)
+# -------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TX_PATH = os.path.join(BASE_DIR, "data", "transactions.csv")
+CUST_PATH = os.path.join(BASE_DIR, "data", "customers.csv")
+DELTA_DIR = os.path.join(BASE_DIR, "data", "deltas")
+CACHE_DIR = os.path.join(BASE_DIR, "data", "cache")
+
+# amount, timestamp and the boolean flags are typed by validation (validation.py)
+TX_DTYPES = {
+    "transaction_id": str, "customer_id": str, "currency": str,
+    "origin_country": str, "destination_country": str, "channel": str,
+    "transaction_type": str, "counterparty_type": str, "device_id": str, "alert_type": str,
+}
+
+# Bump when the cached state layout changes so old caches are rebuilt
+CACHE_FORMAT = 10
+
+CORRIDOR_KEYS = ["risk_score", "alert_type", "origin_country", "destination_country"]
+
+_refresh_lock = threading.Lock()
+
+# -------------------------------------------
+# Typed reads
+# -------------------------------------------
+def read_transactions(path: str, customer_ids: pd.Index, quarantine_dir: str = QUARANTINE_DIR):
+    """
+    Parse and validate a transactions CSV into the typed layout the cache
+    stores. Returns (transactions, validation report).
+    """
+    table = load_rates()
+    tx, report = read_validated(
+        path, TX_SCHEMA, dtype=TX_DTYPES,
+        enums={"currency": table.currencies + [BASE_CURRENCY]},
+        foreign_keys={"customer_id": customer_ids},
+        quarantine_dir=quarantine_dir,
+    )
+    if "alert_type" not in tx.columns:
+        tx["alert_type"] = ""
+    tx["alert_type"] = tx["alert_type"].fillna("")
+    if "is_flagged" not in tx.columns:
+        tx["is_flagged"] = tx["alert_type"] != ""
+    tx["is_flagged"] = tx["is_flagged"].astype(bool)
+    if "amount_base" not in tx.columns:
+        add_amount_base(tx, table)
+    return tx, report
+
+
+def _customer_attrs(cust_path: str = CUST_PATH, quarantine_dir: str = QUARANTINE_DIR):
+    """
+    Customer fields the refresh needs (PEP flag for rules, risk fields for
+    strata and filter options), validated. Returns (customers, validation report).
+    """
+    customers, report = read_validated(
+        cust_path, CUSTOMER_SCHEMA,
+        usecols=["customer_id", "pep_flag", "risk_score", "jurisdiction_risk"],
+        quarantine_dir=quarantine_dir,
+    )
+    return customers.set_index("customer_id"), report
+
+
+def _source_signature(path: str) -> str:
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+# -------------------------------------------
+# Aggregates (updated from each batch alone)
+# -------------------------------------------
+def empty_aggregates() -> dict:
+    return {
+        # Count / amount (base currency) per CORRIDOR_KEYS, the exact corridor map's table
+        "corridor_counts": pd.DataFrame(
+            {"Count": pd.Series(dtype="int64"), "amount": pd.Series(dtype="float64")}
+        ),
+        # approximate mode: stratified sample + distinct-count sketches
+        "sample": StratifiedSample(),
+        "customer_hll": CellSketches(["risk_score", "alert_type", "origin_country"]),
+        "country_hll": CellSketches(["risk_score", "alert_type", "origin_country"]),
+        # shared-device clusters (devices.py); updated before rules run on a batch
+        "device_links": DeviceLinks(),
+        # rolling per-customer baselines for deviation scoring
+        "profiles": BaselineProfiles(),
+        # filter options / counts / date range (incl. alert counts), also written out as metadata.json
+        "metadata": empty_metadata(),
+    }
+
+
+def update_aggregates(agg: dict, batch: pd.DataFrame, customers: pd.DataFrame) -> dict:
+    """Fold one batch in. Profiles must have seen the batch (their customers give the distinct count)."""
+    keyed = batch.assign(
+        risk_score=batch["customer_id"].map(customers["risk_score"]),
+        jurisdiction_risk=batch["customer_id"].map(customers["jurisdiction_risk"]),
+    )
+    counts = keyed.groupby(CORRIDOR_KEYS, dropna=False, observed=True).agg(
+        Count=("amount_base", "size"), amount=("amount_base", "sum")
+    )
+    old = agg["corridor_counts"]
+    if not old.empty:
+        counts = old.add(counts, fill_value=0)
+        counts["Count"] = counts["Count"].astype("int64")
+    agg["corridor_counts"] = counts
+
+    agg["sample"].update(keyed)
+    agg["customer_hll"].update(keyed, "customer_id")
+    agg["country_hll"].update(keyed, "origin_country")
+    update_metadata(agg["metadata"], keyed, n_customers=len(agg["profiles"].customers))
+    return agg
+
+# -------------------------------------------
+# Cache files
+# -------------------------------------------
+def _manifest_path(cache_dir: str) -> str:
+    return os.path.join(cache_dir, "manifest.json")
+
+
+def load_manifest(cache_dir: str = CACHE_DIR) -> dict | None:
+    path = _manifest_path(cache_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def _cache_lock(cache_dir: str):
+    """Exclusive writer lock on `cache_dir`, across threads and processes."""
+    os.makedirs(cache_dir, exist_ok=True)
+    with _refresh_lock, open(os.path.join(cache_dir, "refresh.lock"), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)  # released when the file closes
+        yield
+
+
+def _save(cache_dir: str, manifest: dict, state: RuleState, agg: dict) -> None:
+    """
+    Write state and aggregates as a new generation, then swap in the manifest
+    naming it: readers only follow the manifest, so they never pair it with
+    another version's aggregates. The previous generation is kept for readers
+    still holding the old manifest.
+    """
+    previous = load_manifest(cache_dir) or {}
+    generation = f"{manifest['base_id']}-{manifest['version']:06d}"
+    manifest["rule_state"] = f"rule_state-{generation}.pkl"
+    manifest["aggregates"] = f"aggregates-{generation}.pkl"
+    _atomic_write(os.path.join(cache_dir, manifest["rule_state"]), pickle.dumps(state))
+    _atomic_write(os.path.join(cache_dir, manifest["aggregates"]), pickle.dumps(agg))
+    save_metadata(
+        dict(agg["metadata"], base_id=manifest["base_id"], version=manifest["version"], watermark=manifest["watermark"]),
+        os.path.join(cache_dir, "metadata.json"),
+    )
+    _atomic_write(_manifest_path(cache_dir), json.dumps(manifest, indent=2).encode("utf-8"))
+
+    keep = {m.get(k) for m in (manifest, previous) for k in ("rule_state", "aggregates")}
+    for pattern in ("rule_state-*.pkl", "aggregates-*.pkl"):
+        for path in glob.glob(os.path.join(cache_dir, pattern)):
+            if os.path.basename(path) not in keep:
+                os.remove(path)
+
+
+def _id_hashes(ids: pd.Series) -> np.ndarray:
+    return pd.util.hash_pandas_object(ids, index=False).to_numpy()
+
+
+def _part_index(frame: pd.DataFrame) -> tuple:
+    """
+    Per-customer row positions within one part, grouped: (customer_ids,
+    start offsets, positions). Readers shift them by the rows before the part.
+    """
+    codes, keys = pd.factorize(frame["customer_id"])
+    order = np.argsort(codes, kind="stable")
+    starts = np.searchsorted(codes[order], np.arange(len(keys) + 1))
+    return list(keys), starts, order
+
+
+def _add_part(cache_dir: str, manifest: dict, frame: pd.DataFrame) -> None:
+    """
+    Write `frame` as the next part, with its sorted transaction_id hashes,
+    per-customer row index and time range.
+    """
+    n = len(manifest["parts"])
+    name = f"part-{n:05d}.pkl"
+    _atomic_write(os.path.join(cache_dir, name), pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL))
+    with open(os.path.join(cache_dir, f"ids-{n:05d}.npy"), "wb") as f:
+        np.save(f, np.sort(_id_hashes(frame["transaction_id"])))
+    _atomic_write(os.path.join(cache_dir, f"index-{n:05d}.pkl"), pickle.dumps(_part_index(frame)))
+    manifest["parts"].append(name)
+    manifest["part_ranges"].append([frame["timestamp"].min().isoformat(), frame["timestamp"].max().isoformat()])
+
+
+def _ingested_ids(cache_dir: str, manifest: dict, lo: pd.Timestamp, hi: pd.Timestamp) -> np.ndarray:
+    """Hashed transaction_ids of the parts whose time range overlaps [lo, hi]."""
+    ids = [
+        np.load(os.path.join(cache_dir, f"ids-{n:05d}.npy"))
+        for n, (first, last) in enumerate(manifest["part_ranges"])
+        if pd.Timestamp(first) <= hi and pd.Timestamp(last) >= lo
+    ]
+    return np.concatenate(ids) if ids else np.zeros(0, dtype=np.uint64)
+
+# -------------------------------------------
+# Refresh
+# -------------------------------------------
+def build_base(
+    tx_path: str = TX_PATH,
+    cust_path: str = CUST_PATH,
+    cache_dir: str = CACHE_DIR,
+    quarantine_dir: str = QUARANTINE_DIR,
+) -> dict:
+    """Full build from transactions.csv (first run, or when either source CSV is regenerated)."""
+    os.makedirs(cache_dir, exist_ok=True)
+    for pattern in ("part-*.pkl", "ids-*.npy", "index-*.pkl"):
+        for old in glob.glob(os.path.join(cache_dir, pattern)):
+            os.remove(old)
+
+    customers, cust_report = _customer_attrs(cust_path, quarantine_dir)
+    tx, tx_report = read_transactions(tx_path, customers.index, quarantine_dir)
+    agg = empty_aggregates()
+    agg["device_links"].update(tx)
+    tx[SCORE_COLUMNS] = agg["profiles"].replay(tx)
+    # Base rows are scored by the same rules as deltas (the CSV's baked-in flags
+    # predate the base-currency band and the device cluster rule); this also seeds the state
+    state = RuleState()
+    clusters = agg["device_links"].features(customers["risk_score"])
+    flags = evaluate_rules(tx, customers["pep_flag"], state, clusters)
+    tx["alert_type"] = flags["alert_type"]
+    tx["is_flagged"] = flags["is_flagged"]
+    watermark = tx["timestamp"].max()
+    state.prune(watermark)
+    agg = update_aggregates(agg, tx, customers=customers)
+
+    source = _source_signature(tx_path)
+    manifest = {
+        "base_id": hashlib.sha1(f"{source}:{datetime.now().isoformat()}".encode("utf-8")).hexdigest()[:12],
+        "format": CACHE_FORMAT,
+        "source": source,
+        "customers_source": _source_signature(cust_path),
+        "version": 1,
+        "watermark": watermark.isoformat(),
+        "rows": len(tx),
+        "parts": [],
+        "part_ranges": [],
+        "applied_deltas": [],
+        # validation reports per source file (validation.py)
+        "quality": {os.path.basename(cust_path): cust_report, os.path.basename(tx_path): tx_report},
+    }
+    _add_part(cache_dir, manifest, tx)
+    _save(cache_dir, manifest, state, agg)
+    return manifest
+
+
+def apply_deltas(
+    delta_dir: str = DELTA_DIR,
+    cust_path: str = CUST_PATH,
+    cache_dir: str = CACHE_DIR,
+    quarantine_dir: str = QUARANTINE_DIR,
+) -> dict:
+    """Apply delta files not yet in the manifest. Returns a summary of what changed."""
+    manifest = load_manifest(cache_dir)
+    applied = set(manifest["applied_deltas"])
+    pending = [p for p in sorted(glob.glob(os.path.join(delta_dir, "*.csv"))) if os.path.basename(p) not in applied]
+    summary = {"version": manifest["version"], "applied": [], "rows": 0, "late_rows": 0, "duplicate_rows": 0, "rejected_rows": 0}
+    if not pending:
+        return summary
+
+    with open(os.path.join(cache_dir, manifest["rule_state"]), "rb") as f:
+        state = pickle.load(f)
+    with open(os.path.join(cache_dir, manifest["aggregates"]), "rb") as f:
+        agg = pickle.load(f)
+    quality = manifest.setdefault("quality", {})
+    customers, quality[os.path.basename(cust_path)] = _customer_attrs(cust_path, quarantine_dir)
+    watermark = pd.Timestamp(manifest["watermark"])
+
+    for path in pending:
+        delta, report = read_transactions(path, customers.index, quarantine_dir)
+        quality[os.path.basename(path)] = report
+        summary["rejected_rows"] += report["rejected"]
+        delta = delta.sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+        # New = transaction_id not ingested yet; timestamps only order rows.
+        # Only rows at or before the watermark can collide with ingested parts.
+        seen = delta["transaction_id"].duplicated().to_numpy()
+        old = (delta["timestamp"] <= watermark).to_numpy()
+        if old.any():
+            known = _ingested_ids(cache_dir, manifest, delta["timestamp"][old].min(), watermark)
+            seen = seen | (old & np.isin(_id_hashes(delta["transaction_id"]), known))
+        late = old & ~seen & (delta["timestamp"] < watermark).to_numpy()
+        quarantine_rows(delta[late], "late_transaction", path, report, quarantine_dir)
+        summary["duplicate_rows"] += int(seen.sum())
+        summary["late_rows"] += int(late.sum())
+        delta = delta[~(seen | late)].reset_index(drop=True)
+
+        if not delta.empty:
+            agg["device_links"].update(delta)
+            delta[SCORE_COLUMNS] = agg["profiles"].score(delta)
+            agg["profiles"].update(delta)
+            clusters = agg["device_links"].features(customers["risk_score"])
+            flags = evaluate_rules(delta, customers["pep_flag"], state, clusters)
+            delta["alert_type"] = flags["alert_type"]
+            delta["is_flagged"] = flags["is_flagged"]
+            update_aggregates(agg, delta, customers=customers)
+            _add_part(cache_dir, manifest, delta)
+            manifest["rows"] += len(delta)
+            watermark = max(watermark, delta["timestamp"].max())
+            state.prune(watermark)
+            summary["rows"] += len(delta)
+
+        manifest["applied_deltas"].append(os.path.basename(path))
+        summary["applied"].append(os.path.basename(path))
+
+    manifest["version"] += 1
+    manifest["watermark"] = watermark.isoformat()
+    _save(cache_dir, manifest, state, agg)
+    summary["version"] = manifest["version"]
+    return summary
+
+
+def refresh(
+    tx_path: str = TX_PATH,
+    cust_path: str = CUST_PATH,
+    delta_dir: str = DELTA_DIR,
+    cache_dir: str = CACHE_DIR,
+    quarantine_dir: str = QUARANTINE_DIR,
+) -> dict:
+    """Bring the cache up to date: rebuild if a source CSV changed, then apply new deltas."""
+    with _cache_lock(cache_dir):
+        manifest = load_manifest(cache_dir)
+        if (
+            manifest is None
+            or manifest.get("format") != CACHE_FORMAT
+            or manifest["source"] != _source_signature(tx_path)
+            or manifest.get("customers_source") != _source_signature(cust_path)
+        ):
+            build_base(tx_path, cust_path, cache_dir, quarantine_dir)
+        return apply_deltas(delta_dir, cust_path, cache_dir, quarantine_dir)
+
+# -------------------------------------------
+# Reader side (one per dashboard process)
+# -------------------------------------------
+class TransactionCache:
+    """
+    In-memory view of the cache. `sync()` follows the manifest and reads
+    only the parts (and their per-customer row indexes) added since the last
+    sync; the aggregates are bounded by the customer count and are reloaded
+    whole.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.base_id = None
+        self.version = None
+        self.watermark = None
+        self.parts = []
+        self.frame = None
+        self.aggregates = None
+        # customer_id -> row positions in the concatenated frame
+        self.customer_index = {}
+        self._lock = threading.Lock()
+
+    @property
+    def key(self) -> str:
+        """Cache key for derived views: changes whenever new data is visible."""
+        return f"{self.base_id}:{self.version}"
+
+    def sync(self) -> bool:
+        with self._lock:
+            manifest = load_manifest(self.cache_dir)
+            if manifest is None:
+                return False
+            if manifest["base_id"] != self.base_id:
+                self.base_id, self.version, self.parts, self.frame = manifest["base_id"], None, [], None
+                self.customer_index = {}
+            if manifest["version"] == self.version:
+                return False
+
+            new_parts = manifest["parts"][len(self.parts):]
+            frames = [pd.read_pickle(os.path.join(self.cache_dir, p)) for p in new_parts]
+            offset = 0 if self.frame is None else len(self.frame)
+            for n, frame in enumerate(frames, start=len(self.parts)):
+                self._extend_index(n, offset)
+                offset += len(frame)
+            if self.frame is not None:
+                frames.insert(0, self.frame)
+            if frames:
+                self.frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+            with open(os.path.join(self.cache_dir, manifest["aggregates"]), "rb") as f:
+                self.aggregates = pickle.load(f)
+
+            self.parts = list(manifest["parts"])
+            self.version = manifest["version"]
+            self.watermark = pd.Timestamp(manifest["watermark"])
+            return True
+
+    def _extend_index(self, n: int, offset: int) -> None:
+        with open(os.path.join(self.cache_dir, f"index-{n:05d}.pkl"), "rb") as f:
+            keys, starts, positions = pickle.load(f)
+        positions = positions + offset
+        index = self.customer_index
+        for cust_id, lo, hi in zip(keys, starts[:-1], starts[1:]):
+            prev = index.get(cust_id)
+            index[cust_id] = positions[lo:hi] if prev is None else np.concatenate([prev, positions[lo:hi]])
+
+    @property
+    def metadata(self) -> dict:
+        """Filter options, counts and date range (metadata.py) for the synced version."""
+        return self.aggregates["metadata"]
+
+    def customer_rows(self, customer_id: str) -> pd.DataFrame:
+        """All transactions for a customer via the per-customer index (no full scan)."""
+        pos = self.customer_index.get(customer_id)
+        if pos is None:
+            return self.frame.iloc[0:0]
+        return self.frame.iloc[pos]
+
+# -------------------------------------------
+# Main
+# -------------------------------------------
+if __name__ == "__main__":
+    os.makedirs(DELTA_DIR, exist_ok=True)
+    result = refresh()
+    manifest = load_manifest()
+    print(f"✅ Cache version {manifest['version']} — {manifest['rows']:,} rows, watermark {manifest['watermark']}")
+    if result["applied"]:
+        print(f"Applied {len(result['applied'])} delta file(s): {result['rows']:,} new rows, "
+              f"{result['duplicate_rows']:,} already ingested skipped, {result['late_rows']:,} late and "
+              f"{result['rejected_rows']:,} invalid quarantined")
+    else:
+        print("No new delta files.")
+    for source, report in manifest.get("quality", {}).items():
+        print(f"🧪 {format_report(source, report)}")
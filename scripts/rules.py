@@ -0,0 +1,174 @@
+# ==========================================================
+# 🧮 FinCrime Signals — rules.py
+# ----------------------------------------------------------
+# Vectorized AML rule engine (shared by transactions_gen.py
+# and the incremental refresh in refresh.py)
+# - STRUCTURING, VELOCITY, HIGH-RISK CORRIDOR, LAYERING,
+#   PEP / OFFSHORE, DEVICE CLUSTER
+# - Optional carry-over RuleState so a delta batch can be
+#   evaluated against counts accumulated from earlier batches
+# ==========================================================
+
+import numpy as np
+import pandas as pd
+
+# Offshore-ish / financial centers for PEP/offshore rule
+OFFSHORE_SET = {
+    "Cayman Islands", "British Virgin Islands", "Bermuda", "Seychelles",
+    "Mauritius", "Panama", "Cyprus", "Malta", "Gibraltar", "Isle of Man",
+    "Guernsey", "Jersey", "Aruba", "Curaçao", "Sint Maarten"
+}
+
+# High-risk jurisdictions from your classification (subset used for corridor rule)
+HIGH_RISK_COUNTRIES = {
+    "Algeria", "Cameroon", "Côte d’Ivoire", "Kenya", "Madagascar", "Mozambique",
+    "Nigeria", "Tanzania", "Cambodia", "China", "Kuwait", "Laos", "Nepal",
+    "Tajikistan", "Vietnam", "Solomon Islands"
+}
+
+# Rule thresholds
+STRUCTURING_BAND = (9000, 9999.99)
+STRUCTURING_TX_TYPES = ["Deposit", "Transfer"]
+STRUCTURING_CURRENCIES = ["USD", "EUR", "GBP"]
+STRUCTURING_MIN_COUNT = 4
+VELOCITY_MIN_COUNT = 15
+LAYERING_WINDOW = "48h"
+LAYERING_MIN_DESTINATIONS = 3
+DEVICE_CLUSTER_MIN_SIZE = 3
+
+# Alert priority: first matching rule names the alert
+ALERT_PRIORITY = [
+    ("rule_corridor", "High-Risk Corridor"),
+    ("rule_structuring", "Structuring"),
+    ("rule_velocity", "Velocity"),
+    ("rule_layering", "Layering"),
+    ("rule_pep_offshore", "PEP-Offshore"),
+    ("rule_device_cluster", "Device Cluster"),
+]
+RULE_COLUMNS = [col for col, _ in ALERT_PRIORITY]
+
+# -------------------------------------------
+# Carry-over state for incremental evaluation
+# -------------------------------------------
+class RuleState:
+    """
+    Windowed counters the rules depend on, keyed the same way the rules
+    group transactions. Merging a batch only touches the keys it contains.
+    """
+
+    def __init__(self):
+        empty_key = pd.MultiIndex.from_arrays([[], []], names=["customer_id", "day"])
+        self.near_counts = pd.Series([], index=empty_key, dtype="int64")
+        self.day_counts = pd.Series([], index=empty_key, dtype="int64")
+        self.dest_pairs = pd.DataFrame(
+            {"customer_id": pd.Series(dtype=object), "bucket": pd.Series(dtype="datetime64[ns]"),
+             "destination_country": pd.Series(dtype=object)}
+        )
+
+    def merge(self, near_counts: pd.Series, day_counts: pd.Series, dest_pairs: pd.DataFrame) -> None:
+        self.near_counts = self.near_counts.add(near_counts, fill_value=0).astype("int64")
+        self.day_counts = self.day_counts.add(day_counts, fill_value=0).astype("int64")
+        self.dest_pairs = pd.concat([self.dest_pairs, dest_pairs], ignore_index=True).drop_duplicates()
+
+    def prune(self, watermark: pd.Timestamp) -> None:
+        """
+        Drop windows that end before `watermark`. Batches only carry rows
+        newer than the watermark, so older windows can never change again
+        and the state stays bounded by the window length.
+        """
+        day_floor = watermark.normalize()
+        bucket_floor = watermark.floor(LAYERING_WINDOW)
+        self.near_counts = self.near_counts[self.near_counts.index.get_level_values("day") >= day_floor]
+        self.day_counts = self.day_counts[self.day_counts.index.get_level_values("day") >= day_floor]
+        self.dest_pairs = self.dest_pairs[self.dest_pairs["bucket"] >= bucket_floor].reset_index(drop=True)
+
+    def layering_counts(self) -> pd.Series:
+        return self.dest_pairs.groupby(["customer_id", "bucket"]).size()
+
+# -------------------------------------------
+# Evaluation
+# -------------------------------------------
+def _lookup(counts: pd.Series, *keys) -> np.ndarray:
+    """Vectorized (customer, window) -> count lookup; missing keys count as 0."""
+    idx = pd.MultiIndex.from_arrays(list(keys))
+    return counts.reindex(idx).fillna(0).to_numpy()
+
+
+def evaluate_rules(
+    tx: pd.DataFrame,
+    pep_map: pd.Series,
+    state: RuleState = None,
+    clusters: pd.DataFrame = None,
+) -> pd.DataFrame:
+    """
+    Return a frame aligned with `tx` holding one boolean column per rule plus
+    `alert_type` / `is_flagged`. When `state` is given, windowed counts are
+    accumulated into it and rules fire on the combined history, so a delta
+    batch only needs its own rows. `clusters` is the per-customer device
+    cluster table from devices.DeviceLinks.features(risk_map); without it
+    the device cluster rule never fires.
+    """
+    ts = pd.to_datetime(tx["timestamp"])
+    day = ts.dt.normalize()
+    bucket = ts.dt.floor(LAYERING_WINDOW)
+    cust = tx["customer_id"]
+    cross = tx["is_cross_border"].astype(bool)
+
+    # 1) STRUCTURING: >= 4 near-threshold deposits/transfers for a customer in the same day
+    #    Band is in the base currency (fx.py); raw amount only if no FX stage ran
+    amount = tx["amount_base"] if "amount_base" in tx.columns else tx["amount"]
+    near_threshold = (
+        amount.between(*STRUCTURING_BAND)
+        & tx["transaction_type"].isin(STRUCTURING_TX_TYPES)
+        & tx["currency"].isin(STRUCTURING_CURRENCIES)
+    )
+    near_counts = near_threshold.groupby([cust, day]).sum().astype("int64")
+    near_counts = near_counts[near_counts > 0].rename_axis(["customer_id", "day"])
+
+    # 2) VELOCITY: >= 15 tx for a customer in the same day
+    day_counts = tx.groupby([cust, day]).size().rename_axis(["customer_id", "day"])
+
+    # 4) LAYERING: >= 3 distinct cross-border destinations per customer per 48h bucket
+    dest_pairs = pd.DataFrame({
+        "customer_id": cust[cross].to_numpy(),
+        "bucket": bucket[cross].to_numpy(),
+        "destination_country": tx.loc[cross, "destination_country"].to_numpy(),
+    }).drop_duplicates()
+
+    if state is None:
+        state = RuleState()
+    state.merge(near_counts, day_counts, dest_pairs)
+
+    out = pd.DataFrame(index=tx.index)
+    out["rule_structuring"] = near_threshold.to_numpy() & (
+        _lookup(state.near_counts, cust, day) >= STRUCTURING_MIN_COUNT
+    )
+    out["rule_velocity"] = _lookup(state.day_counts, cust, day) >= VELOCITY_MIN_COUNT
+
+    # 3) HIGH-RISK CORRIDOR: cross-border AND destination in HIGH_RISK_COUNTRIES
+    out["rule_corridor"] = cross & tx["destination_country"].isin(HIGH_RISK_COUNTRIES)
+
+    out["rule_layering"] = cross.to_numpy() & (
+        _lookup(state.layering_counts(), cust, bucket) >= LAYERING_MIN_DESTINATIONS
+    )
+
+    # 5) PEP / OFFSHORE: customer is PEP and cross-border to offshore/financial center
+    pep = cust.map(pep_map).fillna(False).astype(bool)
+    out["rule_pep_offshore"] = pep & cross & tx["destination_country"].isin(OFFSHORE_SET)
+
+    # 6) DEVICE CLUSTER: customer shares devices with >= 3 customers, at least one High risk
+    if clusters is not None:
+        size = cust.map(clusters["cluster_size"]).fillna(1)
+        high = cust.map(clusters["cluster_high_risk"]).fillna(0)
+        out["rule_device_cluster"] = ((size >= DEVICE_CLUSTER_MIN_SIZE) & (high > 0)).to_numpy()
+    else:
+        out["rule_device_cluster"] = False
+
+    # Combine rules into single flags, prioritize type
+    out["alert_type"] = np.select(
+        [out[col].to_numpy(dtype=bool) for col, _ in ALERT_PRIORITY],
+        [label for _, label in ALERT_PRIORITY],
+        default="",
+    )
+    out["is_flagged"] = out["alert_type"] != ""
+    return out
@@ -0,0 +1,194 @@
+# ==========================================================
+# 🎲 FinCrime Signals — sampling.py
+# ----------------------------------------------------------
+# Approximate query support for exploratory dashboard views
+# - StratifiedSample: per-stratum reservoir (bottom-k random
+#   priorities, so batches merge incrementally at refresh)
+#   stratified by alert_type and risk_score
+# - Horvitz–Thompson style totals with stratified standard
+#   errors for counts / sums / group breakdowns
+# - HyperLogLog sketches per (risk_score, alert_type,
+#   origin_country) cell for unique-customer estimates
+# - risk_score comes from customers.csv at ingest, so strata
+#   and cells are rebuilt with the base when it changes
+# ==========================================================
+
+import os
+
+import numpy as np
+import pandas as pd
+
+# Dashboards switch to approximate mode above this many transactions
+APPROX_ROW_THRESHOLD = int(os.environ.get("FINCRIME_APPROX_ROWS", 1_000_000))
+
+STRATA = ["alert_type", "risk_score"]
+SAMPLE_COLUMNS = [
+    "transaction_id", "timestamp", "customer_id", "amount", "currency", "amount_base",
+    "origin_country", "destination_country", "alert_type", "is_flagged", "risk_score",
+]
+Z_95 = 1.96
+
+# -------------------------------------------
+# Stratified reservoir sample
+# -------------------------------------------
+class StratifiedSample:
+    """
+    Keeps the `per_stratum` rows with the smallest random priority in each
+    stratum. That is a uniform sample without replacement per stratum, and
+    merging a new batch is just "keep the k smallest of old + new".
+    """
+
+    def __init__(self, per_stratum: int = 2000, seed: int = 42):
+        self.per_stratum = per_stratum
+        self.rng = np.random.default_rng(seed)
+        self.rows = pd.DataFrame(columns=SAMPLE_COLUMNS + ["_priority"])
+        self.population = pd.Series(dtype="int64")
+
+    def update(self, batch: pd.DataFrame) -> None:
+        cols = [c for c in SAMPLE_COLUMNS if c in batch.columns]
+        candidates = batch[cols].copy()
+        for col in STRATA:
+            candidates[col] = candidates[col].fillna("Unknown").astype(str)
+        candidates["_priority"] = self.rng.random(len(candidates))
+
+        counts = candidates.groupby(STRATA).size()
+        self.population = counts if self.population.empty else self.population.add(counts, fill_value=0).astype("int64")
+
+        # Only rows that can beat the per-stratum cutoff need to be kept around
+        candidates = candidates.sort_values("_priority").groupby(STRATA, sort=False).head(self.per_stratum)
+        combined = candidates if self.rows.empty else pd.concat([self.rows, candidates], ignore_index=True)
+        self.rows = (
+            combined.sort_values("_priority")
+            .groupby(STRATA, sort=False).head(self.per_stratum)
+            .reset_index(drop=True)
+        )
+
+    def frame(self) -> pd.DataFrame:
+        """Sample rows with `weight` = stratum population / stratum sample size."""
+        sizes = self.rows.groupby(STRATA).size()
+        out = self.rows.drop(columns="_priority").copy()
+        keys = pd.MultiIndex.from_frame(out[STRATA])
+        out["_N"] = self.population.reindex(keys).to_numpy()
+        out["_n"] = sizes.reindex(keys).to_numpy()
+        out["weight"] = out["_N"] / out["_n"]
+        return out
+
+# -------------------------------------------
+# Estimators
+# -------------------------------------------
+def estimate_by(rows: pd.DataFrame, by: str = None, values: str = None) -> pd.DataFrame:
+    """
+    Estimated population total of `values` (or row count) for the sampled
+    `rows` (already filtered from StratifiedSample.frame()), optionally per
+    group of `by`. Returns columns estimate / stderr using the stratified
+    variance with finite population correction. Unmatched sample rows
+    contribute zeros, so only the matching rows are needed.
+    """
+    y = rows[values].to_numpy(dtype=float) if values else np.ones(len(rows))
+    frame = pd.DataFrame({
+        "_stratum": rows[STRATA[0]] + "|" + rows[STRATA[1]],
+        "_group": rows[by].to_numpy() if by else "all",
+        "y": y,
+        "y2": y * y,
+        "_N": rows["_N"].to_numpy(dtype=float),
+        "_n": rows["_n"].to_numpy(dtype=float),
+    })
+
+    cell = frame.groupby(["_group", "_stratum"]).agg(
+        y=("y", "sum"), y2=("y2", "sum"), _N=("_N", "first"), _n=("_n", "first")
+    ).reset_index()
+    n, N = cell["_n"], cell["_N"]
+    cell["total"] = N / n * cell["y"]
+    s2 = ((cell["y2"] - cell["y"] ** 2 / n) / (n - 1).where(n > 1)).fillna(0.0)
+    cell["var"] = N ** 2 * (1 - n / N) * s2 / n
+
+    out = cell.groupby("_group")[["total", "var"]].sum()
+    out = pd.DataFrame({"estimate": out["total"], "stderr": np.sqrt(out["var"].clip(lower=0))})
+    out.index.name = by or "group"
+    return out.reset_index()
+
+
+def estimate_total(rows: pd.DataFrame, values: str = None) -> tuple:
+    est = estimate_by(rows, values=values)
+    if est.empty:
+        return 0.0, 0.0
+    return float(est["estimate"].iloc[0]), float(est["stderr"].iloc[0])
+
+# -------------------------------------------
+# HyperLogLog
+# -------------------------------------------
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """Vectorized bit_length for uint64 (float log2 is exact on 32-bit halves)."""
+    hi = (x >> np.uint64(32)).astype(np.float64)
+    lo = (x & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    with np.errstate(divide="ignore"):
+        bl_hi = np.where(hi > 0, np.floor(np.log2(hi)) + 1 + 32, 0)
+        bl_lo = np.where(lo > 0, np.floor(np.log2(lo)) + 1, 0)
+    return np.where(hi > 0, bl_hi, bl_lo).astype(np.int64)
+
+
+def hll_registers(values, p: int) -> tuple:
+    """(register index, rank) per value from a 64-bit hash."""
+    h = pd.util.hash_array(np.asarray(values, dtype=object))
+    idx = (h >> np.uint64(64 - p)).astype(np.int64)
+    rest = h & np.uint64((1 << (64 - p)) - 1)
+    rank = (64 - p) - _bit_length(rest) + 1
+    return idx, rank.astype(np.uint8)
+
+
+def hll_estimate(registers: np.ndarray) -> float:
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.power(2.0, -registers.astype(np.float64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * m and zeros:
+        return m * np.log(m / zeros)  # linear counting for small cardinalities
+    return float(raw)
+
+
+class CellSketches:
+    """
+    One HyperLogLog per cell of `keys` (e.g. risk_score × alert_type ×
+    origin_country). Any filter over those keys is answered by merging
+    (max) the matching registers.
+    """
+
+    def __init__(self, keys: list, p: int = 10):
+        self.keys = list(keys)
+        self.p = p
+        self.cells = pd.DataFrame(columns=self.keys)
+        self.registers = np.zeros((0, 1 << p), dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / np.sqrt(1 << self.p)
+
+    def update(self, batch: pd.DataFrame, value_col: str) -> None:
+        keys = batch[self.keys].fillna("Unknown").astype(str)
+        cells = pd.MultiIndex.from_frame(keys)
+        known = pd.MultiIndex.from_frame(self.cells) if len(self.cells) else pd.MultiIndex.from_tuples([], names=self.keys)
+        new_cells = cells.unique().difference(known)
+        if len(new_cells):
+            self.cells = pd.concat([self.cells, new_cells.to_frame(index=False)], ignore_index=True)
+            self.registers = np.vstack([self.registers, np.zeros((len(new_cells), 1 << self.p), dtype=np.uint8)])
+            known = pd.MultiIndex.from_frame(self.cells)
+
+        row = known.get_indexer(cells)
+        idx, rank = hll_registers(batch[value_col].to_numpy(), self.p)
+        np.maximum.at(self.registers, (row, idx), rank)
+
+    def estimate(self, **filters) -> float:
+        mask = np.ones(len(self.cells), dtype=bool)
+        for key, val in filters.items():
+            if val is not None:
+                mask &= (self.cells[key] == val).to_numpy()
+        if not mask.any():
+            return 0.0
+        return hll_estimate(self.registers[mask].max(axis=0))
+
+    def matching_cells(self, **filters) -> pd.DataFrame:
+        mask = np.ones(len(self.cells), dtype=bool)
+        for key, val in filters.items():
+            if val is not None:
+                mask &= (self.cells[key] == val).to_numpy()
+        return self.cells[mask]
@@ -0,0 +1,347 @@
+# ==========================================================
+# 🛂 FinCrime Signals — screening.py
+# ----------------------------------------------------------
+# Watchlist name screening for customers.csv
+# - Names are normalized once (accents, case, punctuation,
+#   titles, token order) and cached; customers are screened
+#   per distinct normalized name, not per row
+# - A character-trigram inverted index over the watchlist's
+#   name tokens (prefix filter on the rarest trigrams, Dice
+#   bound, fuzzy token ratio) resolves each customer token
+#   once to watchlist entries; a name's candidates are the
+#   entries hit on its tokens, and only those get fuzzy scored
+# - Batches of names are scored in a process pool; the index
+#   is shipped to each worker once
+# - Results feed screening_result ("Clear" / "Potential Match"
+#   / "Confirmed Hit") and onboarding_decision
+# ==========================================================
+
+import os
+import re
+import math
+import argparse
+import unicodedata
+from difflib import SequenceMatcher
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# -------------------------------
+# Paths (robust to working dir)
+# -------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CUSTOMERS_PATH = os.path.join(BASE_DIR, "data", "customers.csv")
+WATCHLIST_PATH = os.path.join(BASE_DIR, "data", "watchlist.csv")
+RESULTS_PATH = os.path.join(BASE_DIR, "data", "screening_results.csv")
+
+# Watchlist tokens a name token may match: trigram Dice prefilter, then fuzzy ratio
+MIN_TOKEN_DICE = 0.34
+TOKEN_MATCH_SCORE = 0.75
+# Fuzzy name score thresholds (SequenceMatcher ratio on normalized names)
+POTENTIAL_MATCH_SCORE = 0.88
+CONFIRMED_HIT_SCORE = 0.92  # ...and the date of birth must match
+
+TITLES = {"mr", "mrs", "ms", "miss", "dr", "md", "dds", "dvm", "phd", "jr", "sr", "ii", "iii", "iv", "v"}
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+RESULT_COLUMNS = [
+    "watchlist_entry_id", "watchlist_name", "watchlist_list", "screening_score", "screening_result",
+]
+
+
+# ---------------------------------------
+# Normalization
+# ---------------------------------------
+@lru_cache(maxsize=1 << 20)
+def normalize_name(name: str) -> str:
+    """Accent-, case-, punctuation- and order-insensitive name key ("Dr. José  Ruiz" -> "jose ruiz")."""
+    if not isinstance(name, str):
+        return ""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    tokens = [t for t in _NON_ALNUM.sub(" ", text).split() if t not in TITLES]
+    return " ".join(sorted(tokens))
+
+
+def trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)} if key else set()
+
+
+# ---------------------------------------
+# Index
+# ---------------------------------------
+def _postings(lens: np.ndarray, values: np.ndarray, n_values: int):
+    """Invert CSR rows (row lengths `lens`, concatenated `values`) into value -> rows postings."""
+    owner = np.repeat(np.arange(len(lens), dtype=np.int64), lens)
+    counts = np.bincount(values, minlength=n_values)
+    return np.r_[0, np.cumsum(counts)], owner[np.argsort(values, kind="stable")], counts
+
+
+def _gather(ptr: np.ndarray, values: np.ndarray, rows: np.ndarray):
+    """Concatenated CSR rows `rows` of (`ptr`, `values`), plus each row's length."""
+    lens = ptr[rows + 1] - ptr[rows]
+    starts = np.repeat(ptr[rows] - np.r_[0, np.cumsum(lens)[:-1]], lens)
+    return values[starts + np.arange(lens.sum())], lens
+
+
+def _aligned_ratio(key: str, other: str) -> float:
+    """Fuzzy ratio after reordering `key`'s tokens to follow their closest tokens in `other`."""
+    left, ordered = key.split(), []
+    for tok in other.split():
+        if not left:
+            break
+        pick = max(left, key=lambda q: SequenceMatcher(None, q, tok, autojunk=False).ratio())
+        left.remove(pick)
+        ordered.append(pick)
+    return SequenceMatcher(None, " ".join(ordered + left), other, autojunk=False).ratio()
+
+
+class WatchlistIndex:
+    """
+    Inverted indexes over normalized watchlist names:
+    name tokens -> entries, and character trigrams -> name tokens.
+    A customer token resolves (once, cached) to the entries holding any
+    watchlist token within TOKEN_MATCH_SCORE of it; a name's candidates are
+    the entries matched on all of its tokens (all but one for 3+ tokens).
+    """
+
+    def __init__(self, watchlist: pd.DataFrame):
+        self.entries = watchlist.reset_index(drop=True)
+        self.keys = [normalize_name(n) for n in self.entries["name"]]
+
+        # Entry -> tokens, token -> entries
+        split = [k.split() for k in self.keys]
+        self.entry_ntok = np.fromiter((len(t) for t in split), dtype=np.int64, count=len(split))
+        token_codes, self.tokens = pd.factorize(pd.Index([t for toks in split for t in toks], dtype=object))
+        self.tok_ptr, self.tok_entry, _ = _postings(self.entry_ntok, token_codes.astype(np.int64), len(self.tokens))
+        self.tokens = list(self.tokens)
+
+        # Trigram -> tokens
+        vocab, rows = {}, []
+        for tok in self.tokens:
+            rows.append(sorted({vocab.setdefault(g, len(vocab)) for g in trigrams(tok)}))
+        self.vocab = vocab
+        self.tok_ngrams = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+        self.tok_grams = np.fromiter((g for r in rows for g in r), dtype=np.int64, count=int(self.tok_ngrams.sum()))
+        self.tok_gram_ptr = np.r_[0, np.cumsum(self.tok_ngrams)]
+        self.gram_ptr, self.gram_token, self.doc_freq = _postings(self.tok_ngrams, self.tok_grams, len(vocab))
+
+        self._token_cache = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_token_cache"] = {}
+        return state
+
+    def similar_tokens(self, token: str) -> np.ndarray:
+        """Watchlist token codes within TOKEN_MATCH_SCORE of `token`."""
+        grams = trigrams(token)
+        t = len(grams)
+        q = np.array(sorted(self.vocab[g] for g in grams if g in self.vocab), dtype=np.int64)
+        # Dice >= θ needs at least k shared trigrams, so any such token shares one of
+        # the (n - k + 1) rarest known trigrams: probe only those postings
+        k = max(math.ceil(MIN_TOKEN_DICE * t / (2 - MIN_TOKEN_DICE)), 1)
+        if len(q) < k:
+            return q[:0]
+        probe = q[np.argsort(self.doc_freq[q], kind="stable")[:len(q) - k + 1]]
+        cand = np.unique(_gather(self.gram_ptr, self.gram_token, probe)[0])
+
+        # Length bound, then exact shared-trigram counts
+        e = self.tok_ngrams[cand]
+        cand = cand[2 * np.minimum(e, t) >= MIN_TOKEN_DICE * (t + e)]
+        if not len(cand):
+            return cand
+        flat, lens = _gather(self.tok_gram_ptr, self.tok_grams, cand)
+        pos = np.searchsorted(q, flat).clip(max=len(q) - 1)
+        common = np.add.reduceat((q[pos] == flat).astype(np.int64), np.r_[0, np.cumsum(lens)[:-1]])
+        cand = cand[2 * common >= MIN_TOKEN_DICE * (t + lens)]
+
+        matcher = SequenceMatcher(None, b=token, autojunk=False)
+        keep = []
+        for c in cand:
+            matcher.set_seq1(self.tokens[c])
+            if matcher.quick_ratio() >= TOKEN_MATCH_SCORE and matcher.ratio() >= TOKEN_MATCH_SCORE:
+                keep.append(c)
+        return np.array(keep, dtype=np.int64)
+
+    def token_entries(self, token: str) -> np.ndarray:
+        """Sorted entries holding a watchlist token similar to `token` (cached per token)."""
+        entries = self._token_cache.get(token)
+        if entries is None:
+            entries = np.unique(_gather(self.tok_ptr, self.tok_entry, self.similar_tokens(token))[0])
+            self._token_cache[token] = entries
+        return entries
+
+    def candidates(self, key: str) -> np.ndarray:
+        """Entries matching every token of `key` (all but one for 3+ tokens), of similar length."""
+        sets = sorted((self.token_entries(t) for t in dict.fromkeys(key.split())), key=len)
+        if not sets:
+            return np.zeros(0, dtype=np.int64)
+        need = len(sets) if len(sets) <= 2 else len(sets) - 1
+        base = sets[0] if need == len(sets) else np.union1d(sets[0], sets[1])
+        hits = np.zeros(len(base), dtype=np.int64)
+        for entries in sets:
+            if len(entries):
+                pos = np.searchsorted(entries, base).clip(max=len(entries) - 1)
+                hits += entries[pos] == base
+        cand = base[hits >= need]
+        ntok = self.entry_ntok[cand]
+        return cand[(ntok >= need) & (ntok <= len(sets) + 1)]
+
+    def best_match(self, key: str) -> tuple:
+        """(entry position, fuzzy score) of the best-scoring candidate, or (-1, 0.0)."""
+        best, best_score = -1, 0.0
+        if not key:
+            return best, best_score
+        matcher = SequenceMatcher(None, b=key, autojunk=False)
+        for i in self.candidates(key):
+            matcher.set_seq1(self.keys[i])
+            if matcher.real_quick_ratio() <= best_score:
+                continue
+            bound = matcher.quick_ratio()
+            if bound <= best_score:
+                continue
+            score = matcher.ratio()
+            if score < POTENTIAL_MATCH_SCORE <= bound:
+                # A typo in a token's first letter can reorder the sorted key
+                score = max(score, _aligned_ratio(key, self.keys[i]))
+            if score > best_score:
+                best, best_score = int(i), score
+        return best, best_score
+
+    def screen_keys(self, keys) -> list:
+        return [self.best_match(k) for k in keys]
+
+
+# ---------------------------------------
+# Batch screening (process pool)
+# ---------------------------------------
+_index = None
+
+
+def _init_worker(index: WatchlistIndex) -> None:
+    global _index
+    _index = index
+
+
+def _run_chunk(keys: list) -> list:
+    return _index.screen_keys(keys)
+
+
+def screen_names(
+    names: pd.Series,
+    index: WatchlistIndex,
+    workers: int = None,
+    chunk_size: int = 5_000,
+) -> pd.DataFrame:
+    """
+    Best watchlist match per name in `names` (same index): watchlist entry
+    position (-1 = none) and fuzzy score. Each distinct normalized name is
+    scored once.
+    """
+    name_codes, unique_names = pd.factorize(names)
+    key_codes, keys = pd.factorize(pd.Index(unique_names).map(normalize_name))
+    keys = list(keys)
+    chunks = [keys[i:i + chunk_size] for i in range(0, len(keys), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        matches = index.screen_keys(keys)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index,)) as pool:
+            matches = [m for part in pool.map(_run_chunk, chunks) for m in part]
+
+    entry = np.array([m[0] for m in matches] + [-1], dtype=np.int64)
+    score = np.array([m[1] for m in matches] + [0.0])
+    row_key = np.where(name_codes >= 0, np.append(key_codes, -1)[name_codes], -1)
+    return pd.DataFrame({"entry": entry[row_key], "score": score[row_key]}, index=names.index)
+
+
+def classify(customers: pd.DataFrame, matches: pd.DataFrame, index: WatchlistIndex) -> pd.DataFrame:
+    """Screening result columns (RESULT_COLUMNS) for `customers` from screen_names output."""
+    hit = matches["entry"].to_numpy() >= 0
+    pos = np.where(hit, matches["entry"].to_numpy(), 0)
+    listed = index.entries.iloc[pos].reset_index(drop=True)
+    score = matches["score"].to_numpy().round(3)
+
+    dob_match = hit & (listed["dob"].astype(str).to_numpy() == customers["dob"].astype(str).to_numpy())
+    result = np.select(
+        [(score >= CONFIRMED_HIT_SCORE) & dob_match, score >= POTENTIAL_MATCH_SCORE],
+        ["Confirmed Hit", "Potential Match"],
+        "Clear",
+    )
+    flagged = result != "Clear"
+    return pd.DataFrame({
+        "watchlist_entry_id": np.where(flagged, listed["entry_id"].to_numpy(), None),
+        "watchlist_name": np.where(flagged, listed["name"].to_numpy(), None),
+        "watchlist_list": np.where(flagged, listed["list_name"].to_numpy(), None),
+        "screening_score": np.where(flagged, score, 0.0),
+        "screening_result": result,
+    }, index=customers.index)
+
+
+def onboarding_decision(customers: pd.DataFrame) -> pd.Series:
+    """Same rule as customers_gen.py: KYC rejection, then High risk / any screening hit -> review."""
+    review = (customers["risk_score"] == "High") | (customers["screening_result"] != "Clear")
+    return pd.Series(
+        np.where(customers["kyc_status"] == "Rejected", "Rejected",
+                 np.where(review, "Manual Review", "Approved")),
+        index=customers.index,
+    )
+
+
+def apply_results(customers: pd.DataFrame, results: pd.DataFrame) -> pd.DataFrame:
+    out = customers.copy()
+    out["screening_result"] = results["screening_result"]
+    out["onboarding_decision"] = onboarding_decision(out)
+    return out
+
+
+def screen_customers(
+    customers: pd.DataFrame,
+    watchlist: pd.DataFrame,
+    workers: int = None,
+    chunk_size: int = 5_000,
+) -> pd.DataFrame:
+    """Screen `customers` against `watchlist`; returns RESULT_COLUMNS indexed like `customers`."""
+    index = WatchlistIndex(watchlist)
+    matches = screen_names(customers["name"], index, workers=workers, chunk_size=chunk_size)
+    return classify(customers, matches, index)
+
+# -------------------------------------------
+# Main
+# -------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Screen customers.csv names against a local watchlist.")
+    parser.add_argument("--customers", default=CUSTOMERS_PATH)
+    parser.add_argument("--watchlist", default=WATCHLIST_PATH)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=5_000)
+    parser.add_argument("--results", default=RESULTS_PATH, help="CSV of Potential Match / Confirmed Hit rows")
+    parser.add_argument("--out", default=None, help="Updated customers CSV (default: overwrite --customers)")
+    args = parser.parse_args()
+
+    for path in (args.customers, args.watchlist):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Input not found at: {path}")
+    customers = pd.read_csv(args.customers)
+    watchlist = pd.read_csv(args.watchlist)
+
+    results = screen_customers(customers, watchlist, workers=args.workers, chunk_size=args.chunk_size)
+    updated = apply_results(customers, results)
+
+    hits = pd.concat([customers[["customer_id", "name", "dob"]], results], axis=1)
+    hits[hits["screening_result"] != "Clear"].to_csv(args.results, index=False)
+    out = args.out or args.customers
+    tmp = f"{out}.tmp"
+    updated.to_csv(tmp, index=False)
+    os.replace(tmp, out)
+
+    print(f"✅ Screened {len(customers):,} customers against {len(watchlist):,} watchlist entries")
+    print(results["screening_result"].value_counts().to_string())
+    print(f"✅ Updated screening_result / onboarding_decision -> {out}")
+    print(f"✅ Matches -> {args.results}")
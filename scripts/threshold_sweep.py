@@ -0,0 +1,298 @@
+# ==========================================================
+# 🎛️ FinCrime Signals — threshold_sweep.py
+# ----------------------------------------------------------
+# What-if threshold tuning over the rule engine (rules.py)
+# - Rule features computed once per transaction: near-threshold
+#   eligibility, daily counts, distinct cross-border
+#   destinations per layering window, device cluster size
+# - Rows no configuration in the grid can flag are dropped
+#   before the sweep
+# - Each configuration is a handful of vectorized comparisons;
+#   the grid is split across a process pool
+# - Output: alert volumes per rule, multi-rule overlap and
+#   overlap with the current (baseline) thresholds
+# ==========================================================
+
+import os
+import argparse
+import itertools
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import rules
+import refresh
+
+# -------------------------------
+# Paths (robust to working dir)
+# -------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SWEEP_DIR = os.path.join(BASE_DIR, "data", "sweeps")
+
+PARAMS = [
+    "structuring_low", "structuring_high", "structuring_min_count",
+    "velocity_min_count", "layering_window", "layering_min_destinations",
+    "device_cluster_min_size",
+]
+BASELINE = {
+    "structuring_low": rules.STRUCTURING_BAND[0],
+    "structuring_high": rules.STRUCTURING_BAND[1],
+    "structuring_min_count": rules.STRUCTURING_MIN_COUNT,
+    "velocity_min_count": rules.VELOCITY_MIN_COUNT,
+    "layering_window": rules.LAYERING_WINDOW,
+    "layering_min_destinations": rules.LAYERING_MIN_DESTINATIONS,
+    "device_cluster_min_size": rules.DEVICE_CLUSTER_MIN_SIZE,
+}
+
+# -------------------------------------------
+# Features (computed once)
+# -------------------------------------------
+def _group_ids(*keys) -> np.ndarray:
+    """Dense integer id per distinct combination of the integer `keys`."""
+    frame = pd.DataFrame({f"k{i}": k for i, k in enumerate(keys)})
+    return frame.groupby(list(frame.columns), sort=False).ngroup().to_numpy()
+
+
+def _distinct_destinations(cust: np.ndarray, ts: pd.Series, dest: np.ndarray, cross: np.ndarray, window: str) -> np.ndarray:
+    """Distinct cross-border destinations per (customer, window bucket), per row (0 if not cross-border)."""
+    bucket = ts.dt.floor(window).to_numpy().astype(np.int64)
+    out = np.zeros(len(cust), dtype=np.int32)
+    idx = np.flatnonzero(cross)
+    if len(idx):
+        group = _group_ids(cust[idx], bucket[idx])
+        pairs = _group_ids(group, dest[idx])
+        _, first = np.unique(pairs, return_index=True)
+        out[idx] = np.bincount(group[first], minlength=group.max() + 1)[group]
+    return out
+
+
+def compute_features(tx: pd.DataFrame, pep_map: pd.Series, windows, clusters: pd.DataFrame = None) -> dict:
+    """
+    Threshold-independent rule features as flat numpy arrays, matching the
+    grouping in rules.evaluate_rules. `windows` are the layering windows
+    used anywhere in the grid; `clusters` is the device cluster table.
+    """
+    ts = pd.to_datetime(tx["timestamp"])
+    day = ts.dt.normalize().to_numpy().astype(np.int64)
+    cust = pd.factorize(tx["customer_id"])[0]
+    dest = pd.factorize(tx["destination_country"])[0]
+    cross = tx["is_cross_border"].astype(bool).to_numpy()
+    amount = tx["amount_base"] if "amount_base" in tx.columns else tx["amount"]
+
+    cust_day = _group_ids(cust, day)
+    pep = tx["customer_id"].map(pep_map).fillna(False).astype(bool).to_numpy()
+    if clusters is None:
+        cluster_size = np.zeros(len(tx), dtype=np.int64)
+    else:
+        # Only clusters with a High-risk member can fire; others count as size 0
+        risky = clusters["cluster_size"].where(clusters["cluster_high_risk"] > 0, 0)
+        cluster_size = tx["customer_id"].map(risky).fillna(0).to_numpy(dtype=np.int64)
+    return {
+        "rows": len(tx),
+        "customer": cust,
+        "cust_day": cust_day,
+        "day_count": np.bincount(cust_day)[cust_day].astype(np.int32),
+        "amount": amount.to_numpy(dtype=np.float64),
+        "structuring_eligible": (
+            tx["transaction_type"].isin(rules.STRUCTURING_TX_TYPES)
+            & tx["currency"].isin(rules.STRUCTURING_CURRENCIES)
+        ).to_numpy(),
+        "cross": cross,
+        "destinations": {w: _distinct_destinations(cust, ts, dest, cross, w) for w in windows},
+        "cluster_size": cluster_size,
+        # Threshold-free rules: corridor and PEP/offshore
+        "corridor": cross & tx["destination_country"].isin(rules.HIGH_RISK_COUNTRIES).to_numpy(),
+        "pep_offshore": pep & cross & tx["destination_country"].isin(rules.OFFSHORE_SET).to_numpy(),
+    }
+
+
+def prune_features(features: dict, configs: pd.DataFrame) -> dict:
+    """
+    Keep only rows at least one configuration could flag. Rules are
+    monotone in their thresholds, so the loosest value of each parameter
+    bounds every configuration in the grid.
+    """
+    structuring = features["structuring_eligible"] & (
+        (features["amount"] >= configs["structuring_low"].min())
+        & (features["amount"] <= configs["structuring_high"].max())
+    )
+    keep = (
+        features["corridor"]
+        | features["pep_offshore"]
+        | (features["day_count"] >= configs["velocity_min_count"].min())
+        | structuring
+        | (features["cluster_size"] >= configs["device_cluster_min_size"].min())
+    )
+    for window, min_dest in configs.groupby("layering_window")["layering_min_destinations"].min().items():
+        keep |= features["cross"] & (features["destinations"][window] >= min_dest)
+
+    idx = np.flatnonzero(keep)
+    pruned = {k: v[idx] for k, v in features.items() if isinstance(v, np.ndarray)}
+    pruned["destinations"] = {w: d[idx] for w, d in features["destinations"].items()}
+    pruned["rows"] = features["rows"]
+    pruned["structuring_candidate"] = structuring[idx]
+    # Re-code customer/day groups densely over the surviving rows
+    pruned["cust_day"] = pd.factorize(pruned["cust_day"])[0]
+    pruned["customer"] = pd.factorize(pruned["customer"])[0]
+    return pruned
+
+# -------------------------------------------
+# Evaluation (run inside worker processes)
+# -------------------------------------------
+_features = None
+_baseline = None
+
+
+def _init_worker(features: dict, baseline: np.ndarray) -> None:
+    global _features, _baseline
+    _features, _baseline = features, baseline
+
+
+def evaluate_config(f: dict, config: dict) -> dict:
+    """Per-rule boolean masks over the feature rows for one configuration."""
+    amount = f["amount"]
+    near = f["structuring_candidate"] & (amount >= config["structuring_low"]) & (amount <= config["structuring_high"])
+    near_counts = np.bincount(f["cust_day"][near], minlength=len(f["cust_day"]))
+    return {
+        "rule_corridor": f["corridor"],
+        "rule_structuring": near & (near_counts[f["cust_day"]] >= config["structuring_min_count"]),
+        "rule_velocity": f["day_count"] >= config["velocity_min_count"],
+        "rule_layering": f["cross"] & (f["destinations"][config["layering_window"]] >= config["layering_min_destinations"]),
+        "rule_pep_offshore": f["pep_offshore"],
+        "rule_device_cluster": f["cluster_size"] >= config["device_cluster_min_size"],
+    }
+
+
+def flagged_mask(masks: dict) -> np.ndarray:
+    return np.logical_or.reduce([masks[col] for col in rules.RULE_COLUMNS])
+
+
+def summarize(f: dict, config: dict, baseline: np.ndarray) -> dict:
+    masks = evaluate_config(f, config)
+    hits = np.sum([masks[col] for col in rules.RULE_COLUMNS], axis=0)
+    flagged = hits > 0
+    shared = int(np.count_nonzero(flagged & baseline))
+    union = int(np.count_nonzero(flagged | baseline))
+
+    row = dict(config)
+    row.update({col.replace("rule_", "") + "_alerts": int(np.count_nonzero(masks[col])) for col in rules.RULE_COLUMNS})
+    row.update({
+        "flagged_tx": int(np.count_nonzero(flagged)),
+        "flagged_pct": round(100 * np.count_nonzero(flagged) / max(f["rows"], 1), 3),
+        "flagged_customers": int(np.count_nonzero(np.bincount(f["customer"][flagged], minlength=1))),
+        "multi_rule_tx": int(np.count_nonzero(hits > 1)),
+        "shared_with_baseline": shared,
+        "new_vs_baseline": int(np.count_nonzero(flagged & ~baseline)),
+        "dropped_vs_baseline": int(np.count_nonzero(baseline & ~flagged)),
+        "jaccard_vs_baseline": round(shared / union, 4) if union else 1.0,
+    })
+    return row
+
+
+def _run_chunk(configs: list) -> list:
+    return [summarize(_features, c, _baseline) for c in configs]
+
+# -------------------------------------------
+# Sweep
+# -------------------------------------------
+def build_grid(**values) -> pd.DataFrame:
+    """Cartesian product of parameter values; missing parameters use the baseline."""
+    axes = [list(values.get(p) or [BASELINE[p]]) for p in PARAMS]
+    grid = pd.DataFrame(list(itertools.product(*axes)), columns=PARAMS)
+    return grid[grid["structuring_low"] <= grid["structuring_high"]].reset_index(drop=True)
+
+
+def sweep(
+    tx: pd.DataFrame,
+    pep_map: pd.Series,
+    configs: pd.DataFrame,
+    clusters: pd.DataFrame = None,
+    workers: int = None,
+    chunk_size: int = 25,
+) -> pd.DataFrame:
+    """
+    Evaluate every configuration in `configs` (columns = PARAMS), plus the
+    baseline, against `tx`. Features are computed and pruned once, shipped to each worker
+    once, and configurations are evaluated in chunks.
+    """
+    configs = pd.concat([pd.DataFrame([BASELINE]), configs[PARAMS]], ignore_index=True)
+    windows = configs["layering_window"].unique()
+    features = prune_features(compute_features(tx, pep_map, windows, clusters), configs)
+    baseline = flagged_mask(evaluate_config(features, BASELINE))
+
+    records = configs.drop_duplicates().to_dict(orient="records")
+    chunks = [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        results = [summarize(features, c, baseline) for c in records]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(features, baseline)) as pool:
+            results = [row for rows in pool.map(_run_chunk, chunks) for row in rows]
+
+    out = pd.DataFrame(results)
+    out.insert(0, "is_baseline", (out[PARAMS] == pd.Series(BASELINE)).all(axis=1))
+    return out
+
+# -------------------------------------------
+# Main
+# -------------------------------------------
+def _floats(text):
+    return [float(v) for v in text.split(",")]
+
+
+def _ints(text):
+    return [int(v) for v in text.split(",")]
+
+
+def _windows(text):
+    values = text.split(",")
+    for v in values:
+        pd.Timedelta(v)  # reject unparseable window lengths up front
+    return values
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sweep rule thresholds and report alert volumes per configuration.",
+        epilog="Comma-separated values per parameter, e.g. --velocity-min 10,12,15 --structuring-low 8000,9000",
+    )
+    parser.add_argument("--structuring-low", type=_floats)
+    parser.add_argument("--structuring-high", type=_floats)
+    parser.add_argument("--structuring-min", type=_ints)
+    parser.add_argument("--velocity-min", type=_ints)
+    parser.add_argument("--layering-window", type=_windows)
+    parser.add_argument("--layering-min", type=_ints)
+    parser.add_argument("--device-cluster-min", type=_ints)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=None, help="CSV path (default: data/sweeps/...)")
+    args = parser.parse_args()
+
+    grid = build_grid(
+        structuring_low=args.structuring_low,
+        structuring_high=args.structuring_high,
+        structuring_min_count=args.structuring_min,
+        velocity_min_count=args.velocity_min,
+        layering_window=args.layering_window,
+        layering_min_destinations=args.layering_min,
+        device_cluster_min_size=args.device_cluster_min,
+    )
+
+    # Same data the dashboards see: base CSV plus applied deltas
+    refresh.refresh()
+    cache = refresh.TransactionCache()
+    cache.sync()
+    customers, _ = refresh._customer_attrs(refresh.CUST_PATH)
+
+    started = datetime.now()
+    clusters = cache.aggregates["device_links"].features(customers["risk_score"])
+    result = sweep(cache.frame, customers["pep_flag"], grid, clusters=clusters, workers=args.workers)
+    elapsed = (datetime.now() - started).total_seconds()
+
+    out_path = args.out or os.path.join(SWEEP_DIR, f"threshold_sweep_{started.strftime('%Y%m%d-%H%M%S')}.csv")
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    result.to_csv(out_path, index=False)
+
+    print(f"✅ {len(result):,} configurations over {len(cache.frame):,} transactions in {elapsed:.1f}s -> {out_path}")
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(result.sort_values("flagged_tx").head(20).to_string(index=False))
@@ -5,6 +5,7 @@
 # - ~10,000 transactions
 # - Risk-weighted sampling (High > Medium > Low)
 # - Cross-border logic and AML flagging rules
+# - Small mule rings sharing devices across customers
 # - Reproducible with a fixed seed
 # ==========================================================
 
@@ -18,6 +19,11 @@ import numpy as np
 import pandas as pd
 from faker import Faker
 
+from devices import DeviceLinks
+from fx import add_amount_base
+from rules import HIGH_RISK_COUNTRIES, evaluate_rules
+from validation import CUSTOMER_SCHEMA, format_report, read_validated
+
 SEED = 42
 random.seed(SEED)
 np.random.seed(SEED)
@@ -37,7 +43,9 @@ OUT_PATH = os.path.join(BASE_DIR, "data", "transactions.csv")
 def load_customers(path=CUSTOMERS_PATH) -> pd.DataFrame:
     if not os.path.exists(path):
         raise FileNotFoundError(f"customers.csv not found at: {path}")
-    df = pd.read_csv(path)
+    df, report = read_validated(path, CUSTOMER_SCHEMA)
+    if report["rejected"]:
+        print(f"🧪 {format_report(os.path.basename(path), report)} -> {report['quarantine']}")
     # Keep only onboarded population (Approved / Manual Review)
     df = df[df["onboarding_decision"].isin(["Approved", "Manual Review"])].copy()
     if df.empty:
@@ -54,19 +62,7 @@ CURRENCIES = ["EUR", "USD", "GBP"]
 CHANNELS = ["Online", "Mobile", "ATM", "Branch", "API", "POS"]
 TX_TYPES = ["Transfer", "Payment", "Deposit", "Withdrawal", "Bill Payment"]
 
-# Offshore-ish / financial centers for PEP/offshore rule
-OFFSHORE_SET = {
-    "Cayman Islands", "British Virgin Islands", "Bermuda", "Seychelles",
-    "Mauritius", "Panama", "Cyprus", "Malta", "Gibraltar", "Isle of Man",
-    "Guernsey", "Jersey", "Aruba", "Curaçao", "Sint Maarten"
-}
-
-# High-risk jurisdictions from your classification (subset used for corridor rule)
-HIGH_RISK_COUNTRIES = {
-    "Algeria", "Cameroon", "Côte d’Ivoire", "Kenya", "Madagascar", "Mozambique",
-    "Nigeria", "Tanzania", "Cambodia", "China", "Kuwait", "Laos", "Nepal",
-    "Tajikistan", "Vietnam", "Solomon Islands"
-}
+# OFFSHORE_SET / HIGH_RISK_COUNTRIES live in rules.py alongside the rule engine
 
 # -------------------------------------------
 # Helper: sample destination country
@@ -124,6 +120,25 @@ def sample_device_id(customer_row: pd.Series) -> str:
     pool = [f"{customer_row['customer_id'][:8]}-dev-{i+1}" for i in range(n)]
     return rng.choice(pool)
 
+# Mule rings: a few customers (weighted to higher risk) share a ring device
+MULE_RING_SHARE = 0.03
+MULE_RING_SIZES = [2, 3, 4, 5]
+MULE_RING_DEVICE_RATE = 0.3
+
+def assign_mule_rings(customers: pd.DataFrame) -> dict:
+    """customer_id -> shared ring device id for the customers placed in rings."""
+    weights = customers["risk_score"].map({"Low": 1.0, "Medium": 2.0, "High": 4.0}).fillna(1.0)
+    n_members = int(len(customers) * MULE_RING_SHARE)
+    members = customers.sample(n=n_members, weights=weights, random_state=SEED)["customer_id"].tolist()
+    rings, ring_no = {}, 0
+    while members:
+        size = random.choice(MULE_RING_SIZES)
+        ring_no += 1
+        for cust_id in members[:size]:
+            rings[cust_id] = f"ring-{ring_no:03d}-dev"
+        members = members[size:]
+    return rings
+
 # -------------------------------------------
 # Generate timestamps over a window
 # -------------------------------------------
@@ -156,6 +171,7 @@ def generate_transactions(n_rows: int = 10_000) -> pd.DataFrame:
 
     # All possible destination countries (from onboarded residencies)
     country_universe = sorted(customers["residency_country"].dropna().unique().tolist())
+    rings = assign_mule_rings(customers)
 
     rows = []
     for i, cust in picked.iterrows():
@@ -179,6 +195,8 @@ def generate_transactions(n_rows: int = 10_000) -> pd.DataFrame:
         tx_type = random.choices(TX_TYPES, weights=[0.55, 0.20, 0.15, 0.05, 0.05])[0]
         is_cash = tx_type in {"Deposit", "Withdrawal"} and random.random() < (0.20 if account_type == "Personal" else 0.08)
         device_id = sample_device_id(cust)
+        if cust["customer_id"] in rings and random.random() < MULE_RING_DEVICE_RATE:
+            device_id = rings[cust["customer_id"]]
         ts = sample_timestamp(datetime.now(), months=9)
 
         rows.append({
@@ -202,72 +220,20 @@ def generate_transactions(n_rows: int = 10_000) -> pd.DataFrame:
 
     tx = pd.DataFrame(rows)
 
+    # FX normalization: amount_base (EUR) drives threshold rules and volume aggregates
+    add_amount_base(tx)
+
     # -------------------------------------------
-    # Flagging logic (post-processing)
+    # Flagging logic (post-processing, see rules.py)
     # -------------------------------------------
-
-    # Helper: same-day key
-    tx["ts_dt"] = pd.to_datetime(tx["timestamp"])
-    tx["day"] = tx["ts_dt"].dt.date
-
-    # 1) STRUCTURING: many sub-threshold credits in 24h (simulate 10k reporting threshold)
-    #    We'll flag customers with >= 4 deposits/transfers in [9000, 10000) (USD/EUR/GBP) in same day
-    near_threshold = (
-        (tx["amount"].between(9000, 9999.99))
-        & (tx["transaction_type"].isin(["Deposit", "Transfer"]))
-        & (tx["currency"].isin(["USD", "EUR", "GBP"]))
-    )
-    grp = tx[near_threshold].groupby(["customer_id", "day"]).size().reset_index(name="cnt")
-    structuring_keys = set(grp[grp["cnt"] >= 4].apply(lambda r: (r["customer_id"], r["day"]), axis=1).tolist())
-    tx["rule_structuring"] = tx.apply(lambda r: near_threshold.loc[r.name] and ((r["customer_id"], r["day"]) in structuring_keys), axis=1)
-
-    # 2) VELOCITY: >= 15 tx for same customer within any rolling 24h
-    #    Approx: per day counts >= 15
-    day_counts = tx.groupby(["customer_id", "day"]).size().reset_index(name="dcount")
-    velocity_keys = set(day_counts[day_counts["dcount"] >= 15].apply(lambda r: (r["customer_id"], r["day"]), axis=1).tolist())
-    tx["rule_velocity"] = tx.apply(lambda r: (r["customer_id"], r["day"]) in velocity_keys, axis=1)
-
-    # 3) HIGH-RISK CORRIDOR: cross-border AND destination in HIGH_RISK_COUNTRIES
-    tx["rule_corridor"] = tx["is_cross_border"] & tx["destination_country"].isin(HIGH_RISK_COUNTRIES)
-
-    # 4) LAYERING: >= 3 distinct destination countries within 48h window
-    #    Approximation: per customer per 2-day bucket distinct dest >= 3
-    tx["two_day_bucket"] = (tx["ts_dt"].dt.floor("48H")).astype(str)
-    dest_counts = (
-        tx[tx["is_cross_border"]]
-        .groupby(["customer_id", "two_day_bucket"])["destination_country"]
-        .nunique()
-        .reset_index(name="ndest")
-    )
-    layering_keys = set(dest_counts[dest_counts["ndest"] >= 3].apply(lambda r: (r["customer_id"], r["two_day_bucket"]), axis=1).tolist())
-    tx["rule_layering"] = tx.apply(lambda r: r["is_cross_border"] and ((r["customer_id"], r["two_day_bucket"]) in layering_keys), axis=1)
-
-    # 5) PEP / OFFSHORE: customer is PEP and cross-border to offshore/financial center
-    #    Merge minimal customer data to tx for PEP flag
     customers = load_customers()  # reload (cheap) to get pep_flag
     pep_map = customers.set_index("customer_id")["pep_flag"]
-    tx["pep_flag"] = tx["customer_id"].map(pep_map).fillna(False)
-    tx["rule_pep_offshore"] = tx["pep_flag"] & tx["is_cross_border"] & tx["destination_country"].isin(OFFSHORE_SET)
-
-    # Combine rules into single flags, prioritize type
-    def choose_alert(row) -> str:
-        if row["rule_corridor"]:
-            return "High-Risk Corridor"
-        if row["rule_structuring"]:
-            return "Structuring"
-        if row["rule_velocity"]:
-            return "Velocity"
-        if row["rule_layering"]:
-            return "Layering"
-        if row["rule_pep_offshore"]:
-            return "PEP-Offshore"
-        return ""
-
-    tx["alert_type"] = tx.apply(choose_alert, axis=1)
-    tx["is_flagged"] = tx["alert_type"] != ""
-
-    # Housekeeping: drop helper cols
-    tx = tx.drop(columns=["ts_dt", "day", "two_day_bucket", "rule_structuring", "rule_velocity", "rule_corridor", "rule_layering", "rule_pep_offshore", "pep_flag"])
+    links = DeviceLinks()
+    links.update(tx)
+    clusters = links.features(customers.set_index("customer_id")["risk_score"])
+    flags = evaluate_rules(tx, pep_map, clusters=clusters)
+    tx["alert_type"] = flags["alert_type"]
+    tx["is_flagged"] = flags["is_flagged"]
 
     # Sort by time for readability
     tx = tx.sort_values("timestamp").reset_index(drop=True)
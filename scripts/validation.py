@@ -0,0 +1,245 @@
+# ==========================================================
+# 🧪 FinCrime Signals — validation.py
+# ----------------------------------------------------------
+# Data-quality stage for ingest (refresh.py) and loaders
+# - Declarative schemas: required columns, not-null / unique
+#   keys, timestamps, numeric ranges, booleans, enums
+# - One vectorized pass per chunk: typed columns are coerced
+#   and checked together, plus foreign keys
+#   (transactions.customer_id must exist in customers)
+# - Failing rows are quarantined to a side CSV with the names
+#   of the checks they failed; counts per check are returned
+#   for the manifest / CLI
+# ==========================================================
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from rules import ALERT_PRIORITY
+
+# -------------------------------
+# Paths (robust to working dir)
+# -------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUARANTINE_DIR = os.path.join(BASE_DIR, "data", "quarantine")
+
+CHUNK_ROWS = 1_000_000
+
+RISK_LEVELS = ["Low", "Medium", "High"]
+
+TX_SCHEMA = {
+    "required": [
+        "transaction_id", "customer_id", "timestamp", "amount", "currency", "origin_country",
+        "destination_country", "channel", "transaction_type", "counterparty_type",
+        "is_cross_border", "is_cash", "device_id",
+    ],
+    "not_null": ["transaction_id", "customer_id", "timestamp", "amount", "currency"],
+    # duplicates within a chunk (later occurrences are rejected)
+    "unique": [],
+    "timestamps": ["timestamp"],
+    # column -> (exclusive lower bound, inclusive upper bound); None = open
+    "ranges": {"amount": (0, None)},
+    "bools": ["is_cross_border", "is_cash", "is_flagged"],
+    # currency is checked against the FX rate table (see refresh.read_transactions)
+    "enums": {
+        "channel": ["Online", "Mobile", "ATM", "Branch", "API", "POS"],
+        "transaction_type": ["Transfer", "Payment", "Deposit", "Withdrawal", "Bill Payment"],
+        "counterparty_type": ["Individual", "Business", "Exchange"],
+        "alert_type": [""] + [label for _, label in ALERT_PRIORITY],
+    },
+}
+
+CUSTOMER_SCHEMA = {
+    "required": ["customer_id", "name", "pep_flag", "risk_score", "jurisdiction_risk"],
+    "not_null": ["customer_id", "name"],
+    "unique": ["customer_id"],
+    "timestamps": ["dob", "join_date"],
+    "ranges": {"device_count": (0, None)},
+    "bools": ["pep_flag"],
+    "enums": {
+        "jurisdiction_risk": RISK_LEVELS,
+        "risk_score": RISK_LEVELS,
+        "account_type": ["Personal", "Business"],
+        "screening_result": ["Clear", "Potential Match", "Confirmed Hit"],
+        "kyc_status": ["Verified", "Pending", "Rejected"],
+        "onboarding_decision": ["Approved", "Manual Review", "Rejected"],
+    },
+}
+
+_TRUE = {"true", "1", "yes"}
+_FALSE = {"false", "0", "no"}
+
+
+def check_columns(columns, schema: dict, source: str) -> None:
+    """File-level schema check: every required column present."""
+    missing = [c for c in schema["required"] if c not in columns]
+    if missing:
+        raise ValueError(f"{source} is missing required column(s): {', '.join(missing)}")
+
+
+def _as_bool(values: pd.Series):
+    """(bool values, unparseable mask); CSV-inferred bool columns pass straight through."""
+    if values.dtype == bool:
+        return values, np.zeros(len(values), dtype=bool)
+    text = values.astype("string").str.strip().str.lower()
+    parsed = text.isin(_TRUE)
+    return parsed.to_numpy(dtype=bool), ~(parsed | text.isin(_FALSE)).to_numpy(dtype=bool)
+
+
+def validate(
+    chunk: pd.DataFrame,
+    schema: dict,
+    enums: dict = None,
+    foreign_keys: dict = None,
+):
+    """
+    Coerce and check one chunk (a clean chunk is typed in place).
+    `enums` adds / overrides allowed values, `foreign_keys` maps
+    column -> pd.Index of known keys. Returns (clean rows, rejected rows
+    with a `dq_failed` column, {check: failing row count}).
+    """
+    enums = dict(schema["enums"], **(enums or {}))
+    typed, failures = {}, {}
+
+    for col in schema["not_null"]:
+        if col in chunk:
+            failures[f"missing_{col}"] = chunk[col].isna().to_numpy()
+    for col in schema["unique"]:
+        if col in chunk:
+            failures[f"duplicate_{col}"] = (chunk[col].duplicated() & chunk[col].notna()).to_numpy()
+    for col in schema["timestamps"]:
+        if col in chunk:
+            typed[col] = pd.to_datetime(chunk[col], errors="coerce")
+            failures[f"bad_{col}"] = (typed[col].isna() & chunk[col].notna()).to_numpy()
+    for col, (low, high) in schema["ranges"].items():
+        if col in chunk:
+            values = chunk[col] if chunk[col].dtype.kind in "if" else pd.to_numeric(chunk[col], errors="coerce")
+            typed[col] = values
+            failures[f"bad_{col}"] = (values.isna() & chunk[col].notna()).to_numpy()
+            out = np.zeros(len(chunk), dtype=bool)
+            if low is not None:
+                out |= (values <= low).to_numpy()
+            if high is not None:
+                out |= (values > high).to_numpy()
+            failures[f"{col}_out_of_range"] = out
+    for col in schema["bools"]:
+        if col in chunk:
+            typed[col], bad = _as_bool(chunk[col])
+            failures[f"bad_{col}"] = bad & chunk[col].notna().to_numpy()
+    for col, allowed in enums.items():
+        if col in chunk:
+            values = chunk[col].fillna("") if "" in allowed else chunk[col]
+            failures[f"unknown_{col}"] = (~values.isin(allowed) & values.notna()).to_numpy()
+    for col, keys in (foreign_keys or {}).items():
+        failures[f"unknown_{col}"] = (~chunk[col].isin(keys) & chunk[col].notna()).to_numpy()
+
+    bad = np.zeros(len(chunk), dtype=bool)
+    for mask in failures.values():
+        bad |= mask
+    counts = {name: int(mask.sum()) for name, mask in failures.items() if mask.any()}
+
+    if not counts:
+        for col, values in typed.items():
+            chunk[col] = values
+        return chunk, chunk.iloc[:0], counts
+    # Rejected rows keep their raw values for the quarantine file
+    rejected = chunk[bad].assign(dq_failed=[
+        ";".join(name for name, mask in failures.items() if mask[i]) for i in np.flatnonzero(bad)
+    ])
+    clean = chunk[~bad].copy()
+    for col, values in typed.items():
+        clean[col] = values[~bad]
+    return clean, rejected, counts
+
+
+def empty_report() -> dict:
+    return {"rows": 0, "rejected": 0, "checks": {}, "quarantine": None}
+
+
+def _merge_counts(report: dict, clean: pd.DataFrame, rejected: pd.DataFrame, counts: dict) -> None:
+    report["rows"] += len(clean) + len(rejected)
+    report["rejected"] += len(rejected)
+    for name, n in counts.items():
+        report["checks"][name] = report["checks"].get(name, 0) + n
+
+
+def quarantine_path(source: str, quarantine_dir: str = QUARANTINE_DIR) -> str:
+    name = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(quarantine_dir, f"{name}.rejected.csv")
+
+
+def _quarantine(rejected: pd.DataFrame, path: str, first: bool) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rejected.to_csv(path, mode="w" if first else "a", header=first, index=False)
+
+
+def read_validated(
+    path: str,
+    schema: dict,
+    dtype: dict = None,
+    usecols: list = None,
+    enums: dict = None,
+    foreign_keys: dict = None,
+    quarantine_dir: str = QUARANTINE_DIR,
+    chunksize: int = CHUNK_ROWS,
+):
+    """
+    Stream `path` in chunks through `validate`. Rejected rows go to
+    <quarantine_dir>/<name>.rejected.csv (replaced on every read; removed
+    when nothing is rejected). Returns (clean frame, report).
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    check_columns(header, schema, os.path.basename(path))
+    if dtype:
+        dtype = {k: v for k, v in dtype.items() if k in header}
+
+    report, parts = empty_report(), []
+    target = quarantine_path(path, quarantine_dir)
+    for chunk in pd.read_csv(path, dtype=dtype, usecols=usecols, chunksize=chunksize):
+        clean, rejected, counts = validate(chunk, schema, enums, foreign_keys)
+        if len(rejected):
+            _quarantine(rejected, target, first=report["rejected"] == 0)
+        _merge_counts(report, clean, rejected, counts)
+        parts.append(clean)
+
+    if report["rejected"]:
+        report["quarantine"] = target
+    elif os.path.exists(target):
+        os.remove(target)
+    if not parts:
+        return pd.read_csv(path, dtype=dtype, usecols=usecols, nrows=0), report
+    frame = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+    return frame, report
+
+
+def quarantine_rows(
+    rows: pd.DataFrame,
+    reason: str,
+    source: str,
+    report: dict,
+    quarantine_dir: str = QUARANTINE_DIR,
+) -> None:
+    """
+    Quarantine rows that passed validation but were refused later (e.g. late
+    arrivals) under `reason`, appending to `source`'s file and updating its report.
+    """
+    if rows.empty:
+        return
+    target = quarantine_path(source, quarantine_dir)
+    first = report["rejected"] == 0 or not os.path.exists(target)
+    rows = rows.assign(dq_failed=reason)
+    if not first:
+        rows = rows.reindex(columns=pd.read_csv(target, nrows=0).columns)
+    _quarantine(rows, target, first=first)
+    report["rejected"] += len(rows)
+    report["checks"][reason] = report["checks"].get(reason, 0) + len(rows)
+    report["quarantine"] = target
+
+
+def format_report(source: str, report: dict) -> str:
+    line = f"{source}: {report['rows']:,} rows, {report['rejected']:,} quarantined"
+    if report["checks"]:
+        line += " (" + ", ".join(f"{k}={v:,}" for k, v in sorted(report["checks"].items())) + ")"
+    return line
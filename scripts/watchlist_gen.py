@@ -0,0 +1,147 @@
+# ==========================================================
+# 📋 FinCrime Signals — watchlist_gen.py
+# ----------------------------------------------------------
+# Generates a synthetic local watchlist (data/watchlist.csv)
+# for scripts/screening.py
+# - Person entries are mostly syllable-built (transliterated
+#   style) names; a small share recombines first / last names
+#   seen in customers.csv (never an exact customer name) as
+#   near-miss namesakes; plus company-style entity names
+# - Every PEP customer is listed on the PEP list, and a small
+#   share of customers is planted on the sanctions list with
+#   realistic variations (typos, swapped order, dropped
+#   titles, accents) so screening has true hits to find
+# - Reproducible with a fixed seed
+# ==========================================================
+
+import os
+import random
+import argparse
+
+import pandas as pd
+
+SEED = 42
+
+# -------------------------------
+# Paths (robust to working dir)
+# -------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CUSTOMERS_PATH = os.path.join(BASE_DIR, "data", "customers.csv")
+OUT_PATH = os.path.join(BASE_DIR, "data", "watchlist.csv")
+
+LISTS = {
+    "Sanctions (synthetic)": 0.6,
+    "Law Enforcement (synthetic)": 0.25,
+    "PEP (synthetic)": 0.15,
+}
+PLANTED_SHARE = 0.015
+ENTITY_SHARE = 0.2
+NAMESAKE_SHARE = 0.05
+SYLLABLES = [
+    "al", "ab", "dul", "ka", "rim", "ov", "ser", "gei", "mo", "ham", "med", "ra", "shid", "na", "zar",
+    "ba", "yev", "ko", "len", "vic", "tor", "ig", "or", "han", "sen", "li", "wei", "zhou", "xin", "yu",
+    "fa", "rouk", "ta", "rek", "ma", "lik", "ri", "go", "vich", "pet", "ren", "ko", "dmi", "tri", "sha",
+    "hin", "ez", "ad", "ja", "vad", "ku", "mar", "es", "ca", "bar", "dos", "sa", "ntos", "ol", "ga",
+]
+ENTITY_SUFFIXES = ["Holdings Ltd", "Trading LLC", "Import Export", "Group", "Capital", "Logistics SA"]
+TITLES = {"mr", "mrs", "ms", "miss", "dr", "md", "dds", "dvm", "phd", "jr", "sr", "ii", "iii", "iv", "v"}
+ACCENTS = {"a": "á", "e": "é", "i": "í", "o": "ö", "u": "ü", "n": "ñ", "c": "ç"}
+
+
+def _name_parts(name: str) -> list:
+    return [p for p in name.replace(".", "").split() if p.lower() not in TITLES]
+
+
+def _variant(name: str, rng: random.Random) -> str:
+    """A realistic spelling variation of a real name."""
+    parts = _name_parts(name)
+    kind = rng.choice(["typo", "swap", "accent", "upper", "drop_middle"])
+    if kind == "swap" and len(parts) > 1:
+        return f"{parts[-1]}, {' '.join(parts[:-1])}"
+    if kind == "accent":
+        chars = list(" ".join(parts))
+        spots = [i for i, ch in enumerate(chars) if ch in ACCENTS]
+        if spots:
+            i = rng.choice(spots)
+            chars[i] = ACCENTS[chars[i]]
+        return "".join(chars)
+    if kind == "upper":
+        return " ".join(parts).upper()
+    if kind == "drop_middle" and len(parts) > 2:
+        return f"{parts[0]} {parts[-1]}"
+    text = list(" ".join(parts))
+    i = rng.randrange(1, len(text) - 1)
+    text[i] = rng.choice("aeiourstnl") if text[i] != " " else text[i]
+    return "".join(text)
+
+
+def _syllable_name(rng: random.Random, parts: int = 2) -> str:
+    return " ".join(
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize() for _ in range(parts)
+    )
+
+
+def generate_watchlist(customers: pd.DataFrame, size: int = 20_000, seed: int = SEED) -> pd.DataFrame:
+    rng = random.Random(seed)
+    names = customers["name"].dropna().tolist()
+    split = [_name_parts(n) for n in names]
+    firsts = sorted({p[0] for p in split if len(p) > 1})
+    lasts = sorted({p[-1] for p in split if len(p) > 1})
+    taken = {" ".join(p).lower() for p in split}
+
+    rows = []
+
+    # Planted entries: all PEPs (exact) + a small share of customers (variations)
+    peps = customers[customers["pep_flag"] == True]
+    for cust in peps.itertuples(index=False):
+        rows.append({"name": " ".join(_name_parts(cust.name)), "entity_type": "Person",
+                     "list_name": "PEP (synthetic)", "dob": cust.dob, "country": cust.residency_country})
+    planted = customers[customers["pep_flag"] != True].sample(
+        n=max(1, int(len(customers) * PLANTED_SHARE)), random_state=seed
+    )
+    for cust in planted.itertuples(index=False):
+        rows.append({"name": _variant(cust.name, rng), "entity_type": "Person",
+                     "list_name": "Sanctions (synthetic)",
+                     "dob": cust.dob if rng.random() < 0.5 else None, "country": cust.residency_country})
+
+    countries = sorted(customers["residency_country"].dropna().unique())
+    list_names, list_weights = list(LISTS), list(LISTS.values())
+    while len(rows) < size:
+        draw = rng.random()
+        if draw < ENTITY_SHARE:
+            name = f"{_syllable_name(rng, 1)} {rng.choice(ENTITY_SUFFIXES)}"
+            entity_type, dob = "Entity", None
+        else:
+            if draw < ENTITY_SHARE + NAMESAKE_SHARE:
+                name = f"{rng.choice(firsts)} {rng.choice(lasts)}"
+            else:
+                name = _syllable_name(rng, rng.choice([2, 2, 3]))
+            if name.lower() in taken:
+                continue
+            entity_type = "Person"
+            dob = f"{rng.randint(1940, 2000)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        rows.append({"name": name, "entity_type": entity_type,
+                     "list_name": rng.choices(list_names, weights=list_weights)[0],
+                     "dob": dob, "country": rng.choice(countries)})
+
+    rng.shuffle(rows)
+    df = pd.DataFrame(rows)
+    df.insert(0, "entry_id", [f"WL{i:07d}" for i in range(1, len(df) + 1)])
+    return df
+
+# -------------------------------------------
+# Main
+# -------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic watchlist from customers.csv names.")
+    parser.add_argument("--size", type=int, default=20_000)
+    parser.add_argument("--out", default=OUT_PATH)
+    args = parser.parse_args()
+
+    if not os.path.exists(CUSTOMERS_PATH):
+        raise FileNotFoundError(f"customers.csv not found at: {CUSTOMERS_PATH}")
+    watchlist = generate_watchlist(pd.read_csv(CUSTOMERS_PATH), size=args.size)
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    watchlist.to_csv(args.out, index=False)
+    print(f"✅ Generated {len(watchlist):,} watchlist entries -> {args.out}")
+    print(watchlist["list_name"].value_counts().to_string())
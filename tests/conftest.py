@@ -0,0 +1,89 @@
+# ==========================================================
+# 🧪 FinCrime Signals — tests/conftest.py
+# ----------------------------------------------------------
+# Shared fixtures: the scripts/ modules on sys.path (as the
+# dashboards do) and the shipped data/ CSVs
+# ==========================================================
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "scripts"))
+
+import refresh
+from devices import DeviceLinks
+
+
+@pytest.fixture(scope="session")
+def customers(tmp_path_factory):
+    """Validated customer attributes (pep_flag, risk_score) as the refresh reads them."""
+    customers, _ = refresh._customer_attrs(refresh.CUST_PATH, str(tmp_path_factory.mktemp("quarantine")))
+    return customers
+
+
+@pytest.fixture(scope="session")
+def transactions(customers, tmp_path_factory):
+    """Typed transactions.csv (with amount_base), sorted by timestamp."""
+    tx, _ = refresh.read_transactions(refresh.TX_PATH, customers.index, str(tmp_path_factory.mktemp("quarantine")))
+    return tx.sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+
+@pytest.fixture(scope="session")
+def device_clusters(customers):
+    """Builds the device cluster table over a frame, as refresh passes it to the rules."""
+    def build(tx):
+        links = DeviceLinks()
+        links.update(tx)
+        return links.features(customers["risk_score"])
+    return build
+
+
+@pytest.fixture(scope="session")
+def straddling_rows(transactions, customers):
+    """
+    Builds rows on either side of a timestamp (same day and layering window)
+    that only cross a rule threshold once both sides are counted: 2 + 2
+    near-threshold deposits, 8 + 8 same-day payments, 2 + 1 cross-border
+    destinations and a device cluster (two customers, one High risk) joined
+    by a third customer afterwards. The shipped data never trips these rules.
+    Returns (before, after); transaction ids are TXTEST-<rule><side><n>.
+    """
+    plain = customers.index[~customers["pep_flag"] & (customers["risk_score"] == "Low")]
+    high = customers.index[~customers["pep_flag"] & (customers["risk_score"] == "High")][0]
+    structuring, velocity, layering, linked, joiner = plain[:5]
+    template = transactions.iloc[0].to_dict()
+    template.update(
+        amount=50.0, amount_base=50.0, currency="EUR", origin_country="Ireland", destination_country="Ireland",
+        transaction_type="Payment", is_cross_border=False, is_flagged=False, alert_type="",
+    )
+
+    def row(tx_id, customer_id, timestamp, **fields):
+        out = dict(template, device_id=f"{customer_id}-dev-t")
+        out.update(transaction_id=tx_id, customer_id=customer_id, timestamp=timestamp, **fields)
+        return out
+
+    def build(at):
+        sides = ([], [])
+        for side, sign in enumerate((-1, 1)):
+            rows = sides[side]
+            ts = [at + sign * pd.Timedelta(seconds=n + 1) for n in range(8)]
+            rows += [
+                row(f"TXTEST-S{side}{n}", structuring, ts[n], amount=9500.0, amount_base=9500.0, transaction_type="Deposit")
+                for n in range(2)
+            ]
+            rows += [row(f"TXTEST-V{side}{n}", velocity, ts[n]) for n in range(8)]
+            rows += [
+                row(f"TXTEST-L{side}{n}", layering, ts[n], destination_country=dest, is_cross_border=True)
+                for n, dest in enumerate([["France", "Germany"], ["Spain"]][side])
+            ]
+        sides[0].append(row("TXTEST-D00", linked, at - pd.Timedelta(seconds=1)))
+        sides[0].append(row("TXTEST-D01", high, at - pd.Timedelta(seconds=1)))
+        sides[1].append(row("TXTEST-D10", joiner, at + pd.Timedelta(seconds=1), device_id=f"{linked}-dev-t"))
+        sides[1].append(row("TXTEST-D11", joiner, at + pd.Timedelta(seconds=1), device_id=f"{high}-dev-t"))
+        return tuple(pd.DataFrame(rows) for rows in sides)
+
+    return build
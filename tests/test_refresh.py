@@ -0,0 +1,101 @@
+import pandas as pd
+import pytest
+
+import refresh
+from rules import evaluate_rules
+
+DERIVED = ["alert_type", "is_flagged", "amount_base"]
+
+
+def _write(frame, path):
+    frame.drop(columns=DERIVED).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def split_refresh(transactions, straddling_rows, tmp_path):
+    """
+    Base CSV with the first 60% of rows, then two delta files. The first cut
+    falls mid-day with rows on both sides that only trip the windowed and
+    device cluster rules together, so delta flags depend on the carried-over
+    RuleState and device links.
+    """
+    cuts = [int(len(transactions) * 0.6), int(len(transactions) * 0.8)]
+    base, first, second = (transactions.iloc[lo:hi] for lo, hi in zip([0] + cuts, cuts + [None]))
+    at = first["timestamp"].min()
+    assert (at - pd.Timedelta(seconds=10)).floor("48h") == (at + pd.Timedelta(seconds=10)).floor("48h")
+    before, after = straddling_rows(at)
+    base = pd.concat([base, before], ignore_index=True)
+    first = pd.concat([first, after], ignore_index=True)
+
+    delta_dir = tmp_path / "deltas"
+    delta_dir.mkdir()
+    tx_path = _write(base, tmp_path / "transactions.csv")
+    _write(first, delta_dir / "delta-001.csv")
+    _write(second, delta_dir / "delta-002.csv")
+
+    cache_dir = str(tmp_path / "cache")
+    summary = refresh.refresh(
+        tx_path=tx_path, delta_dir=str(delta_dir), cache_dir=cache_dir,
+        quarantine_dir=str(tmp_path / "quarantine"),
+    )
+    assert summary["applied"] == ["delta-001.csv", "delta-002.csv"]
+    assert summary["late_rows"] == summary["duplicate_rows"] == summary["rejected_rows"] == 0
+
+    cache = refresh.TransactionCache(cache_dir)
+    cache.sync()
+    return cache, [len(base), len(base) + len(first)]
+
+
+def _flags(frame):
+    return frame.set_index("transaction_id")[["alert_type", "is_flagged"]].sort_index()
+
+
+def test_delta_flags_match_full_run(split_refresh, customers, device_clusters):
+    cache, cuts = split_refresh
+    frame = cache.frame
+    assert len(frame) == len(frame["transaction_id"].unique())
+
+    # Every row is scored once, at ingestion: delta rows against the whole
+    # history up to and including their file, base rows against the base
+    for stop in cuts + [len(frame)]:
+        upto = frame.iloc[:stop]
+        full = evaluate_rules(upto, customers["pep_flag"], clusters=device_clusters(upto))
+        expected = _flags(pd.concat([upto[["transaction_id"]], full], axis=1))
+        start = max([c for c in cuts if c < stop], default=0)
+        got = _flags(frame.iloc[start:stop])
+        pd.testing.assert_frame_equal(got, expected.loc[got.index])
+
+    # The straddling rows only fire on the delta side, once both sides count
+    alerts = _flags(frame)["alert_type"].filter(like="TXTEST-")
+    assert (alerts[alerts.index.str[8] == "0"] == "").all()
+    after = alerts[alerts.index.str[8] == "1"]
+    assert after.groupby(after.index.str[7]).unique().map(list).to_dict() == {
+        "S": ["Structuring"], "V": ["Velocity"], "L": ["Layering"], "D": ["Device Cluster"],
+    }
+
+
+def test_base_flags_match_full_run(transactions, customers, device_clusters, tmp_path):
+    tx_path = _write(transactions, tmp_path / "transactions.csv")
+    cache_dir = str(tmp_path / "cache")
+    refresh.refresh(
+        tx_path=tx_path, delta_dir=str(tmp_path / "deltas"), cache_dir=cache_dir,
+        quarantine_dir=str(tmp_path / "quarantine"),
+    )
+    cache = refresh.TransactionCache(cache_dir)
+    cache.sync()
+
+    full = evaluate_rules(transactions, customers["pep_flag"], clusters=device_clusters(transactions))
+    expected = _flags(pd.concat([transactions[["transaction_id"]], full], axis=1))
+    pd.testing.assert_frame_equal(_flags(cache.frame), expected)
+
+
+def test_corridor_counts_match_regroup(split_refresh, customers):
+    cache, _ = split_refresh
+    frame = cache.frame.assign(risk_score=cache.frame["customer_id"].map(customers["risk_score"]))
+    expected = frame.groupby(refresh.CORRIDOR_KEYS, observed=True).agg(
+        Count=("transaction_id", "size"), amount=("amount_base", "sum"),
+    )
+    got = cache.aggregates["corridor_counts"]
+    got = got[got["Count"] > 0].sort_index()
+    pd.testing.assert_frame_equal(got, expected.sort_index(), check_dtype=False, check_exact=False)
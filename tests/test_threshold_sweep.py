@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+import rules
+import threshold_sweep
+from rules import evaluate_rules
+
+
+@pytest.fixture(scope="module")
+def tx(transactions, straddling_rows):
+    """Shipped transactions plus rows that trip every rule."""
+    before, after = straddling_rows(transactions["timestamp"].iloc[len(transactions) // 2])
+    return pd.concat([transactions, before, after], ignore_index=True)
+
+
+def test_baseline_matches_evaluate_rules(tx, customers, device_clusters):
+    clusters = device_clusters(tx)
+    flags = evaluate_rules(tx, customers["pep_flag"], clusters=clusters)
+    grid = threshold_sweep.build_grid(velocity_min_count=[5, 15], layering_window=["24h", "48h"])
+    out = threshold_sweep.sweep(tx, customers["pep_flag"], grid, clusters, workers=1)
+
+    baseline = out[out["is_baseline"]]
+    assert len(baseline) == 1
+    row = baseline.iloc[0]
+    assert flags[rules.RULE_COLUMNS].sum().min() > 0
+    for col in rules.RULE_COLUMNS:
+        assert row[col.replace("rule_", "") + "_alerts"] == flags[col].sum(), col
+    assert row["flagged_tx"] == flags["is_flagged"].sum()
+    assert row["flagged_customers"] == tx.loc[flags["is_flagged"], "customer_id"].nunique()
+    assert row["jaccard_vs_baseline"] == 1.0
+
+
+def test_baseline_mask_matches_evaluate_rules(tx, customers, device_clusters):
+    clusters = device_clusters(tx)
+    flags = evaluate_rules(tx, customers["pep_flag"], clusters=clusters)
+    features = threshold_sweep.compute_features(
+        tx, customers["pep_flag"], [rules.LAYERING_WINDOW], clusters,
+    )
+    # Unpruned features: every row keeps its position
+    features["structuring_candidate"] = features["structuring_eligible"]
+    masks = threshold_sweep.evaluate_config(features, threshold_sweep.BASELINE)
+    for col in rules.RULE_COLUMNS:
+        assert (masks[col] == flags[col].to_numpy()).all(), col